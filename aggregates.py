@@ -0,0 +1,145 @@
+"""
+Precomputed aggregate cube for the chart suite:
+- count/mean/median/min/max of price per dimension (brand, model, city, ...)
+- the same per year and per mileage/views/price bin
+Built from mergeable partial states, either over the whole cleaned frame or
+chunk by chunk, and cached on disk keyed by a hash of the source data file
+and of the code that cleans and aggregates it, so re-rendering charts never
+re-reads the dataset and a code change never serves a stale cube.
+"""
+
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+CUBE_VERSION = 2  # bump when the cube layout or bins change
+DEFAULT_CACHE_DIR = '.chart_cache'
+
+DIMENSIONS = ['brand', 'model', 'body_type', 'transmission', 'fuel_type', 'drivetrain', 'color',
+              'city', 'credit_available', 'barter_possible', 'is_new']
+STATS = ['count', 'mean', 'median', 'min', 'max']
+
+MILEAGE_BINS = [0, 50000, 100000, 150000, 200000, 300000, 500000]
+MILEAGE_LABELS = ['0-50k', '50-100k', '100-150k', '150-200k', '200-300k', '300k+']
+VIEWS_BINS = [0, 200, 400, 600, 800, 1000, 2000]
+VIEWS_LABELS = ['Low\n(0-200)', 'Medium-Low\n(200-400)', 'Medium\n(400-600)',
+                'Medium-High\n(600-800)', 'High\n(800-1000)', 'Very High\n(1000+)']
+PRICE_BINS = [0, 10000, 20000, 30000, 40000, 50000, 100000, 500000]
+PRICE_LABELS = ['Budget\n(<10k)', 'Economy\n(10-20k)', 'Mid-Range\n(20-30k)', 'Premium\n(30-40k)',
+                'Luxury\n(40-50k)', 'High-End\n(50-100k)', 'Ultra-Luxury\n(100k+)']
+
+BIN_LABELS = {'mileage_bin': MILEAGE_LABELS, 'views_bin': VIEWS_LABELS, 'price_bin': PRICE_LABELS}
+
+# Raw listing columns the cube is built from
+SOURCE_COLUMNS = DIMENSIONS + ['price', 'year', 'mileage', 'views']
+
+def group_keys(df_clean):
+    """(cube entry, group key per listing) for every aggregate; NaN keys are left out"""
+    for dim in DIMENSIONS:
+        yield dim, df_clean[dim]
+    yield 'year', df_clean['year_numeric']
+    mileage = df_clean['mileage_numeric']
+    yield 'mileage_bin', pd.cut(mileage.where(mileage < 500000), bins=MILEAGE_BINS, labels=MILEAGE_LABELS)
+    yield 'views_bin', pd.cut(df_clean['views_numeric'], bins=VIEWS_BINS, labels=VIEWS_LABELS)
+    yield 'price_bin', pd.cut(df_clean['price_numeric'], bins=PRICE_BINS, labels=PRICE_LABELS)
+
+def partial_cube(df_clean):
+    """Mergeable aggregate state of a batch of cleaned listings.
+
+    For every cube entry, the number of listings per (group, price) pair.
+    Count, mean, min, max and the exact median all follow from these
+    counts, and two states merge by adding them, so the state grows with
+    the number of distinct prices per group rather than with rows.
+    """
+    price = df_clean['price_numeric'].astype('float64')
+    state = {'total': len(df_clean)}
+    for name, keys in group_keys(df_clean):
+        state[name] = price.groupby([keys.astype(object), price], sort=False).size()
+    return state
+
+def merge_partials(a, b):
+    """Combine two partial_cube states"""
+    merged = {'total': a['total'] + b['total']}
+    for name in a:
+        if name != 'total':
+            merged[name] = pd.concat([a[name], b[name]]).groupby(level=[0, 1], sort=False).sum()
+    return merged
+
+def weighted_stats(counts):
+    """STATS of the prices in a price -> listings Series sorted by price"""
+    prices = counts.index.to_numpy(dtype='float64')
+    listings = counts.to_numpy()
+    cumulative = listings.cumsum()
+    total = int(cumulative[-1])
+
+    def nth(position):  # price of the listing at 0-based `position` in price order
+        return prices[np.searchsorted(cumulative, position, side='right')]
+
+    median = (nth((total - 1) // 2) + nth(total // 2)) / 2
+    return [total, (prices * listings).sum() / total, median, prices[0], prices[-1]]
+
+def finalize_cube(state):
+    """Turn a partial_cube state into the cube the charts read"""
+    cube = {'total': state['total']}
+    for name, counts in state.items():
+        if name == 'total':
+            continue
+        counts = counts[counts > 0].sort_index()
+        rows = {key: weighted_stats(group.droplevel(0)) for key, group in counts.groupby(level=0, sort=True)}
+        stats = pd.DataFrame.from_dict(rows, orient='index', columns=STATS)
+        if name in BIN_LABELS:
+            stats = stats.reindex(BIN_LABELS[name])  # keep empty bins
+            stats['count'] = stats['count'].fillna(0)
+        stats['count'] = stats['count'].astype('int64')
+        stats.index.name = name
+        cube[name] = stats
+    return cube
+
+def build_cube(df_clean):
+    """All chart aggregates from the cleaned listings.
+
+    Returns a dict of DataFrames (index = dimension value, year or bin
+    label, columns = STATS) plus 'total', the number of listings analyzed.
+    Bins keep empty intervals (count 0) so histograms show every segment.
+    """
+    return finalize_cube(partial_cube(df_clean))
+
+def build_cube_chunked(chunks):
+    """build_cube over an iterable of cleaned listing chunks, holding one chunk at a time"""
+    return finalize_cube(reduce(merge_partials, map(partial_cube, chunks)))
+
+def dataset_fingerprint(path, code=()):
+    """Content hash of the source data file, this module's source and the source of the
+    modules/functions in `code` (the caller's loading and cleaning), plus the cube layout version"""
+    digest = hashlib.sha1(f"cube-v{CUBE_VERSION}".encode())
+    for obj in (sys.modules[__name__], *code):
+        digest.update(inspect.getsource(obj).encode('utf-8'))
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_or_build_cube(path, build, cache_dir=DEFAULT_CACHE_DIR, code=()):
+    """Cube for the data file at `path`: from cache when its hash matches, else built and cached.
+
+    `build(path)` is only called on a cache miss; `code` lists what it runs
+    outside this module (see dataset_fingerprint). Returns (cube, cached).
+    """
+    cache_path = os.path.join(cache_dir, f"cube-{dataset_fingerprint(path, code)}.pkl")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f), True
+
+    cube = build(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(cube, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    return cube, False
@@ -0,0 +1,526 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the scraper, run against saved HTML pages:
+- parse: per-page extraction time of the single-pass extractor vs. the
+  original per-field find_all(string=...) scans, per parser backend
+- conformance: every installed parser backend must produce the exact
+  record of the html.parser reference on every saved page
+- normalize: typed normalization vs. per-column regex extraction on a
+  synthetic dataset (1M rows by default)
+- crawl: end-to-end crawl time against replay_server.py at several
+  concurrency levels, with optional latency and error injection,
+  optionally through the adaptive rate limiter or with a parse process pool
+- memory: peak Python allocations while parsing and while crawling
+Fixture directories (index/ + cars/) come from `record` (a capture of the
+live site) or `synthesize` (generated pages in the shape the parsers read).
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from normalize import normalize_listings
+
+from parsers import (BACKENDS, CONTACT_FIELDS, DEFAULT_BACKEND, FIELD_MAPPING, parse_car_page,
+                     parse_index_cards)
+from ratelimit import DEFAULT_MAX_RPS, AdaptiveRateLimiter
+from replay_server import DETAIL_DIR, INDEX_DIR, ReplayServer
+
+# Committed fixture site (tests/fixtures/site): hand-written pages in the site's markup
+FIXTURE_SITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tests', 'fixtures', 'site')
+
+def legacy_parse_car_page(content, url):
+    """Original extractor: one full-document text scan per field (baseline)"""
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Initialize with phone/owner first as requested
+    data = {
+        'phone': '',
+        'owner': '',
+        'url': url,
+        'brand': '',
+        'model': '',
+        'price': '',
+        'city': '',
+        'year': '',
+        'body_type': '',
+        'color': '',
+        'engine_volume': '',
+        'engine_power': '',
+        'fuel_type': '',
+        'mileage': '',
+        'transmission': '',
+        'drivetrain': '',
+        'is_new': '',
+        'credit_available': '',
+        'barter_possible': '',
+        'views': '',
+        'updated': '',
+        'listing_id': ''
+    }
+
+    # Field mapping for car data - using EXACT text matching
+    field_mapping = {
+        'Şəhər': 'city',
+        'Marka': 'brand',
+        'Model': 'model',
+        'Buraxılış ili': 'year',
+        'Ban növü': 'body_type',
+        'Rəng': 'color',
+        'Mühərrikin həcmi': 'engine_volume',
+        'Mühərrikin gücü': 'engine_power',
+        'Yanacaq növü': 'fuel_type',
+        'Yürüş': 'mileage',
+        'Sürətlər qutusu': 'transmission',
+        'Ötürücü': 'drivetrain',
+        'Yeni': 'is_new',
+        'Kredit': 'credit_available',
+        'Barter mümkündür': 'barter_possible'
+    }
+
+    # ULTIMATE TEXT-BASED EXTRACTION (proven 100% success rate)
+    for field_name, data_key in field_mapping.items():
+        matching_elements = soup.find_all(string=lambda text: text and field_name in text)
+
+        for elem in matching_elements:
+            parent_td = elem.find_parent('td')
+            if parent_td:
+                parent_row = parent_td.find_parent('tr')
+                if parent_row:
+                    row_tds = parent_row.find_all('td')
+                    if len(row_tds) >= 2:
+                        for idx, td in enumerate(row_tds):
+                            if field_name in td.get_text():
+                                if idx + 1 < len(row_tds):
+                                    value_td = row_tds[idx + 1]
+                                    link = value_td.find('a')
+                                    value = link.get_text(strip=True) if link else value_td.get_text(strip=True)
+                                    if value and value != field_name.replace(':', '') and not data[data_key]:
+                                        data[data_key] = value
+                                        break
+                break
+
+    # MULTI-METHOD PRICE EXTRACTION
+    price_methods = [
+        # Method 1: Standard price element
+        lambda: soup.find('td', class_='rowone price_car1'),
+        # Method 2: Alternative price element
+        lambda: soup.find('td', class_='rowone price_car'),
+        # Method 3: Any element with 'price' in class
+        lambda: soup.find('td', class_=lambda x: x and 'price' in str(x).lower()),
+        # Method 4: Text containing AZN (concise)
+        lambda: next((elem for elem in soup.find_all(string=lambda text: text and 'AZN' in text)
+                    if len(elem.strip().split()) <= 3), None),
+    ]
+
+    for method in price_methods:
+        try:
+            result = method()
+            if result:
+                if hasattr(result, 'get_text'):
+                    price_text = result.get_text(strip=True)
+                else:
+                    price_text = result.strip()
+
+                if price_text and 'AZN' in price_text and not data['price']:
+                    data['price'] = price_text
+                    break
+        except:
+            continue
+
+    # MULTI-METHOD CONTACT EXTRACTION
+    contact_table = soup.find('table', class_='table1')
+    if contact_table:
+        # Owner name
+        owner_elem = contact_table.find('td', class_='rowone')
+        if owner_elem:
+            owner_text = owner_elem.get_text(strip=True)
+            if owner_text and 'AZN' not in owner_text and len(owner_text) < 50:
+                data['owner'] = owner_text
+
+        # Phone number - multiple methods
+        phone_methods = [
+            lambda: contact_table.find('td', class_='row_phone_number'),
+            lambda: contact_table.find('td', string=lambda text: text and '(' in text and ')' in text and any(c.isdigit() for c in text)),
+            lambda: next((elem for elem in contact_table.find_all(string=lambda text: text and '(' in text and ')' in text and len([c for c in text if c.isdigit()]) >= 7)), None)
+        ]
+
+        for method in phone_methods:
+            try:
+                result = method()
+                if result:
+                    if hasattr(result, 'get_text'):
+                        phone_text = result.get_text(strip=True)
+                    else:
+                        phone_text = result.strip()
+
+                    if phone_text and '(' in phone_text and ')' in phone_text and not data['phone']:
+                        data['phone'] = phone_text
+                        break
+            except:
+                continue
+
+        # Additional contact info using text matching
+        contact_fields = {
+            'Baxışların sayı': 'views',
+            'Yeniləndi': 'updated',
+            'nömrəsi': 'listing_id'
+        }
+
+        for field_name, data_key in contact_fields.items():
+            matching_elements = contact_table.find_all(string=lambda text: text and field_name in text)
+            for elem in matching_elements:
+                parent_td = elem.find_parent('td')
+                if parent_td:
+                    parent_row = parent_td.find_parent('tr')
+                    if parent_row:
+                        row_tds = parent_row.find_all('td')
+                        if len(row_tds) >= 2:
+                            for idx, td in enumerate(row_tds):
+                                if field_name in td.get_text():
+                                    if idx + 1 < len(row_tds):
+                                        value_td = row_tds[idx + 1]
+                                        value = value_td.get_text(strip=True)
+                                        if value and value != field_name.replace(':', '') and not data[data_key]:
+                                            data[data_key] = value
+                                            break
+                    break
+
+    return data
+
+def load_pages(html_dir):
+    """Read every saved detail page in `html_dir` as (name, bytes) pairs"""
+    pages = []
+    for name in sorted(os.listdir(html_dir)):
+        path = os.path.join(html_dir, name)
+        if os.path.isfile(path) and not name.startswith('.'):
+            with open(path, 'rb') as f:
+                pages.append((name, f.read()))
+    return pages
+
+def time_parser(parser, pages, repeat):
+    """Best-of-`repeat` wall time per page, in milliseconds"""
+    per_page = []
+    for name, content in pages:
+        runs = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parser(content, name)
+            runs.append(time.perf_counter() - start)
+        per_page.append(min(runs) * 1000)
+    return per_page
+
+def bench_parse(args):
+    pages = load_pages(args.html_dir)
+    if not pages:
+        print(f"No saved pages found in {args.html_dir}")
+        return
+
+    mismatches = [name for name, content in pages
+                  if legacy_parse_car_page(content, name) != parse_car_page(content, name)]
+    print(f"Output check: {len(pages) - len(mismatches)}/{len(pages)} pages identical")
+    for name in mismatches:
+        print(f"  ✗ differs: {name}")
+
+    before = time_parser(legacy_parse_car_page, pages, args.repeat)
+    print(f"\nPer-page parse time over {len(pages)} pages (best of {args.repeat}):")
+    print(f"  {'per-field scans (before)':<28} median {statistics.median(before):6.2f} ms, total {sum(before):7.1f} ms")
+    for backend in BACKENDS:
+        after = time_parser(lambda content, name: parse_car_page(content, name, backend), pages, args.repeat)
+        print(f"  {'single pass, ' + backend:<28} median {statistics.median(after):6.2f} ms, "
+              f"total {sum(after):7.1f} ms ({sum(before) / sum(after):.1f}x)")
+
+def check_conformance(args):
+    """Diff every backend against the html.parser reference; exit 1 on any mismatch"""
+    failures = 0
+    for html_dir, kind in ((args.detail_dir, 'detail'), (args.index_dir, 'index')):
+        if not html_dir:
+            continue
+        pages = load_pages(html_dir)
+        for name, content in pages:
+            if kind == 'detail':
+                expected = parse_car_page(content, name, DEFAULT_BACKEND)
+            else:
+                expected = parse_index_cards(content, args.base_url, DEFAULT_BACKEND)
+            for backend in BACKENDS:
+                if backend == DEFAULT_BACKEND:
+                    continue
+                if kind == 'detail':
+                    actual = parse_car_page(content, name, backend)
+                else:
+                    actual = parse_index_cards(content, args.base_url, backend)
+                if actual != expected:
+                    failures += 1
+                    print(f"  ✗ {backend} differs on {kind} page {name}")
+                    if kind == 'detail':
+                        for key in expected:
+                            if actual.get(key) != expected[key]:
+                                print(f"      {key}: {expected[key]!r} != {actual.get(key)!r}")
+        print(f"Checked {len(pages)} {kind} pages against {len(BACKENDS) - 1} backend(s): {', '.join(BACKENDS)}")
+
+    print("Conformance OK" if not failures else f"Conformance FAILED: {failures} mismatches")
+    if failures:
+        sys.exit(1)
+
+def synthetic_listings(rows, seed=0):
+    """Raw-text listing frame shaped like the scraper's CSV output"""
+    rng = random.Random(seed)
+    brands = ['Toyota', 'Hyundai', 'Mercedes', 'Kia', 'Khazar', 'LADA (VAZ)', 'BMW', 'Opel']
+    cities = ['Bakı', 'Sumqayıt', 'Gəncə', 'Qusar', 'Naxçıvan']
+    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+    pool = 5000  # distinct rows to sample from, like a real market with repeats
+    sample = pd.DataFrame({
+        'brand': [rng.choice(brands) for _ in range(pool)],
+        'model': [f"M{rng.randint(1, 300)}" for _ in range(pool)],
+        'city': [rng.choice(cities) for _ in range(pool)],
+        'price': [f"{rng.randint(2, 900) * 100} AZN" for _ in range(pool)],
+        'mileage': [f"{rng.randint(0, 400)} {rng.randint(0, 999):03d} km" for _ in range(pool)],
+        'engine_volume': [f"{rng.randint(8, 60) / 10} L" for _ in range(pool)],
+        'engine_power': [f"{rng.randint(60, 600)} a.g." for _ in range(pool)],
+        'views': [str(rng.randint(0, 3000)) for _ in range(pool)],
+        'updated': [f"{rng.randint(1, 28):02d}-{rng.choice(months)}-{rng.randint(2023, 2025)}" for _ in range(pool)],
+        'is_new': [rng.choice(['Bəli', 'Xeyir']) for _ in range(pool)],
+        'credit_available': [rng.choice(['Bəli', 'Xeyir']) for _ in range(pool)],
+        'barter_possible': [rng.choice(['Bəli', 'Xeyir']) for _ in range(pool)],
+    })
+    picks = np.random.default_rng(seed).integers(0, pool, rows)
+    return sample.iloc[picks].reset_index(drop=True)
+
+def legacy_normalize(df):
+    """Previous generate_charts.py cleaning: one regex pass per column over every row"""
+    df = df.copy()
+    df['price_numeric'] = df['price'].str.extract(r'(\d+)').astype(float)
+    df['mileage_numeric'] = df['mileage'].str.replace(' ', '').str.extract(r'(\d+)').astype(float)
+    df['engine_volume_numeric'] = df['engine_volume'].str.extract(r'(\d+\.?\d*)').astype(float)
+    df['views_numeric'] = pd.to_numeric(df['views'], errors='coerce')
+    return df
+
+def bench_normalize(args):
+    df = synthetic_listings(args.rows)
+    print(f"Synthetic dataset: {len(df):,} rows, {df.memory_usage(deep=True).sum() / 1e6:.0f} MB as text")
+
+    start = time.perf_counter()
+    legacy_normalize(df)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    typed = normalize_listings(df)
+    typed_time = time.perf_counter() - start
+
+    typed_only = typed.drop(columns=['price', 'mileage', 'engine_volume', 'engine_power', 'views', 'updated'])
+    print(f"  per-column regex (4 fields):  {legacy_time:6.2f} s")
+    print(f"  normalize_listings (9 fields): {typed_time:6.2f} s ({legacy_time / typed_time:.1f}x)")
+    print(f"  typed columns in memory: {typed_only.memory_usage(deep=True).sum() / 1e6:.0f} MB")
+
+def fixture_dirs(fixtures):
+    return os.path.join(fixtures, INDEX_DIR), os.path.join(fixtures, DETAIL_DIR)
+
+def save_fixture(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+def record_fixtures(args):
+    """Capture index and detail pages from a live site into a fixture directory.
+
+    Absolute links to the recorded origin are made root-relative, so the
+    replay server (not the live site) is hit when the fixtures are crawled.
+    """
+    from http_session import HttpClient, create_session
+
+    # Never faster than --rps while recording: the limiter may only back off
+    client = HttpClient(create_session(), throttle=AdaptiveRateLimiter(args.rps, max_rps=args.rps))
+    origin = '{0.scheme}://{0.netloc}'.format(urlsplit(args.base_url)).encode()
+    index_dir, detail_dir = fixture_dirs(args.out)
+    details = 0
+    for page in range(1, args.pages + 1):
+        response = client.get(f"{args.base_url}/new-ads.php?page={page}")
+        if response.status_code != 200:
+            print(f"Stopping at index page {page}: HTTP {response.status_code}")
+            break
+        save_fixture(os.path.join(index_dir, f"new-ads-{page}.html"), response.content.replace(origin, b''))
+        cards, _ = parse_index_cards(response.content, args.base_url)
+        for card in cards[:max(args.details - details, 0)]:
+            detail = client.get(card['url'])
+            if detail.status_code == 200:
+                slug = urlsplit(card['url']).path.rstrip('/').rsplit('/', 1)[-1]
+                save_fixture(os.path.join(detail_dir, slug), detail.content.replace(origin, b''))
+                details += 1
+        print(f"Recorded index page {page}, {details} detail pages so far")
+
+def synthetic_detail_page(listing_id, values, filler):
+    """Detail page with the labelled rows, price cell and contact table the extractor reads"""
+    spec = ''.join(f"<tr><td>{label}:</td><td>{values[field]}</td></tr>" for label, field in FIELD_MAPPING.items())
+    contact = ''.join(f"<tr><td>{label}:</td><td>{values[field]}</td></tr>"
+                      for label, field in CONTACT_FIELDS.items() if field != 'listing_id')
+    return (f"<html><head><title>{values['brand']} {values['model']}</title></head><body>"
+            f"<table class=\"specs\">{spec}<tr><td class=\"price_car1\">{values['price']}</td></tr></table>"
+            f"<table class=\"table1\"><tr><td class=\"rowone\">{values['owner']}</td></tr>"
+            f"<tr><td class=\"row_phone_number\">{values['phone']}</td></tr>{contact}"
+            f"<tr><td>Elanın nömrəsi:</td><td>{listing_id}</td></tr></table>"
+            + ('<p>' + 'Lorem ipsum dolor sit amet. ' * 8 + '</p>') * filler + "</body></html>")
+
+def synthesize_fixtures(args):
+    """Generate a deterministic fixture site: `pages` index pages of `per_page` cards each"""
+    rng = random.Random(args.seed)
+    listings = synthetic_listings(args.pages * args.per_page, args.seed).to_dict('records')
+    index_dir, detail_dir = fixture_dirs(args.out)
+    pager = ''.join(f'<a href="/new-ads.php?page={page}">{page}</a>' for page in range(1, args.pages + 1))
+    for page in range(1, args.pages + 1):
+        cards = []
+        for n in range((page - 1) * args.per_page, page * args.per_page):
+            values = dict(listings[n], year=str(rng.randint(1995, 2025)), body_type='Sedan', color='Ağ',
+                          fuel_type='Benzin', transmission='Avtomat', drivetrain='Ön',
+                          owner=f"Satıcı {n}", phone=f"(050){rng.randint(100, 999)}-{rng.randint(10, 99)}-{n % 100:02d}")
+            listing_id = f"{n + 1:07d}"
+            slug = f"{listing_id}-{values['brand'].lower().replace(' ', '-')}"
+            save_fixture(os.path.join(detail_dir, slug),
+                         synthetic_detail_page(listing_id, values, args.filler).encode('utf-8'))
+            cards.append(f'<div class="cars__item"><a href="/cars/{slug}"><img src="/img/{listing_id}.jpg" '
+                         f'alt="{values["brand"]} {values["model"]}"></a><div>{values["price"]}</div>'
+                         f'<div>{values["year"]}</div><div>{values["mileage"]}</div></div>')
+        html = f"<html><body>{''.join(cards)}<div class=\"pager\">{pager}</div></body></html>"
+        save_fixture(os.path.join(index_dir, f"new-ads-{page}.html"), html.encode('utf-8'))
+    print(f"Wrote {args.pages} index pages and {args.pages * args.per_page} detail pages to {args.out}")
+
+def run_crawl(base_url, workers, backend=DEFAULT_BACKEND, retries=None, throttle=None, parse_workers=0):
+    """One quiet end-to-end crawl of `base_url` with a fresh session; returns (seconds, stats, metrics snapshot)"""
+    from final_complete_scraper import CrawlStats, crawl, parse_args
+    from http_session import DEFAULT_RETRIES, HttpClient, create_session
+    from metrics import CrawlMetrics
+
+    retries = DEFAULT_RETRIES if retries is None else retries
+    scraper_args = parse_args(['--base-url', base_url, '--workers', str(workers), '--parser', backend,
+                               '--parse-workers', str(parse_workers)])
+    session = create_session(pool_size=workers, retries=retries)
+    metrics = CrawlMetrics()
+    # No cache, and no throttle unless one is under test: measure the pipeline itself
+    client = HttpClient(session, throttle=throttle, metrics=metrics, retries=retries)
+    stats = CrawlStats()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        crawl(scraper_args, client, [], stats)
+    return time.perf_counter() - start, stats, metrics.snapshot()
+
+def bench_crawl(args):
+    with ReplayServer(args.fixtures, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      error_statuses=args.error_statuses, seed=args.seed, error_prefix=args.error_prefix) as server:
+        print(f"Replaying {args.fixtures} (latency {args.latency * 1000:.0f} ms + up to {args.jitter * 1000:.0f} ms, "
+              f"{args.error_rate:.0%} injected errors), parser {args.parser}")
+        print(f"  {'workers':>7} {'wall s':>8} {'pages/s':>8} {'served':>7} {'injected':>8} {'records':>8} {'failed':>7}")
+        for workers in args.concurrency:
+            before = dict(server.counters)
+            throttle = AdaptiveRateLimiter(args.rps, max_rps=args.max_rps) if args.rps else None
+            seconds, stats, snapshot = run_crawl(server.url, workers, args.parser, args.retries, throttle,
+                                                 args.parse_workers)
+            served = server.counters['requests'] - before['requests']
+            injected = server.counters['errors'] - before['errors']
+            print(f"  {workers:>7} {seconds:8.2f} {snapshot['pages_per_second']:8.1f} {served:>7} {injected:>8} "
+                  f"{stats.processed:>8} {stats.processed - stats.successful:>7}")
+            if throttle:
+                print(f"          rate limiter: {throttle.summary()}")
+
+def traced_peak(func):
+    """Peak traced Python allocation (MB) while running `func`"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+def bench_memory(args):
+    _, detail_dir = fixture_dirs(args.fixtures)
+    pages = load_pages(detail_dir)
+    print(f"Peak traced allocations parsing {len(pages)} detail pages one at a time:")
+    for backend in BACKENDS:
+        parse_car_page(pages[0][1], pages[0][0], backend)  # warm-up: imports and parser caches
+        peak = max(traced_peak(lambda: parse_car_page(content, name, backend)) for name, content in pages)
+        print(f"  {backend:<12} {peak:7.2f} MB per page")
+
+    print("Peak traced allocations over a full crawl of the replayed fixtures:")
+    with ReplayServer(args.fixtures) as server:
+        run_crawl(server.url, 1, args.parser)  # warm-up
+        for workers in args.concurrency:
+            peak = traced_peak(lambda: run_crawl(server.url, workers, args.parser))
+            print(f"  {workers:>2} workers  {peak:7.2f} MB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline scraper benchmarks")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    parse_cmd = sub.add_parser('parse', help="detail-page extraction time on saved HTML")
+    parse_cmd.add_argument('html_dir', nargs='?', default=os.path.join(FIXTURE_SITE, DETAIL_DIR),
+                           help="directory of saved detail pages (default: the committed fixture pages)")
+    parse_cmd.add_argument('--repeat', type=int, default=5)
+    parse_cmd.set_defaults(func=bench_parse)
+
+    conf_cmd = sub.add_parser('conformance', help="check all parser backends extract identical output")
+    conf_cmd.add_argument('detail_dir', nargs='?', default=os.path.join(FIXTURE_SITE, DETAIL_DIR),
+                          help="directory of saved detail pages (default: the committed fixture pages)")
+    conf_cmd.add_argument('--index-dir', default=os.path.join(FIXTURE_SITE, INDEX_DIR),
+                          help="directory of saved new-ads index pages (default: the committed fixture pages)")
+    conf_cmd.add_argument('--base-url', default='https://www.avtovitrin.com')
+    conf_cmd.set_defaults(func=check_conformance)
+
+    norm_cmd = sub.add_parser('normalize', help="typed normalization throughput on synthetic rows")
+    norm_cmd.add_argument('--rows', type=int, default=1_000_000)
+    norm_cmd.set_defaults(func=bench_normalize)
+
+    record_cmd = sub.add_parser('record', help="capture live index and detail pages as fixtures")
+    record_cmd.add_argument('out', help="fixture directory to write")
+    record_cmd.add_argument('--base-url', default='https://www.avtovitrin.com')
+    record_cmd.add_argument('--pages', type=int, default=3, help="index pages to capture")
+    record_cmd.add_argument('--details', type=int, default=60, help="detail pages to capture")
+    record_cmd.add_argument('--rps', type=float, default=1.0, help="politeness limit while recording")
+    record_cmd.set_defaults(func=record_fixtures)
+
+    synth_cmd = sub.add_parser('synthesize', help="generate a synthetic fixture site")
+    synth_cmd.add_argument('out', help="fixture directory to write")
+    synth_cmd.add_argument('--pages', type=int, default=10)
+    synth_cmd.add_argument('--per-page', type=int, default=20)
+    synth_cmd.add_argument('--filler', type=int, default=60, help="paragraphs of page padding (page size)")
+    synth_cmd.add_argument('--seed', type=int, default=0)
+    synth_cmd.set_defaults(func=synthesize_fixtures)
+
+    crawl_cmd = sub.add_parser('crawl', help="end-to-end crawl time against the local replay server")
+    crawl_cmd.add_argument('fixtures', help="fixture directory (index/ + cars/)")
+    crawl_cmd.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    crawl_cmd.add_argument('--latency', type=float, default=0.05, help="seconds added to every response")
+    crawl_cmd.add_argument('--jitter', type=float, default=0.0, help="extra uniform random delay, up to N seconds")
+    crawl_cmd.add_argument('--error-rate', type=float, default=0.0, help="share of responses replaced by errors")
+    crawl_cmd.add_argument('--error-statuses', type=int, nargs='+', default=[503])
+    crawl_cmd.add_argument('--error-prefix', default='/',
+                           help="only inject errors into paths starting with this, e.g. /cars/ (default: all)")
+    crawl_cmd.add_argument('--retries', type=int, default=None, help="client retries (default: scraper default)")
+    crawl_cmd.add_argument('--rps', type=float, default=0.0,
+                           help="crawl through the adaptive rate limiter starting at N req/s (default: unthrottled)")
+    crawl_cmd.add_argument('--max-rps', type=float, default=DEFAULT_MAX_RPS, help="rate limiter ceiling")
+    crawl_cmd.add_argument('--parser', choices=sorted(BACKENDS), default=DEFAULT_BACKEND)
+    crawl_cmd.add_argument('--parse-workers', type=int, default=0,
+                           help="parse in N worker processes (default 0: in the fetch threads)")
+    crawl_cmd.add_argument('--seed', type=int, default=0)
+    crawl_cmd.set_defaults(func=bench_crawl)
+
+    mem_cmd = sub.add_parser('memory', help="peak allocations while parsing and crawling fixtures")
+    mem_cmd.add_argument('fixtures', help="fixture directory (index/ + cars/)")
+    mem_cmd.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    mem_cmd.add_argument('--parser', choices=sorted(BACKENDS), default=DEFAULT_BACKEND)
+    mem_cmd.set_defaults(func=bench_memory)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Failure handling for detail-page fetches:
+- classify_failure(): only failures that belong to the listing itself
+  (404/410, the parser raising on the page) are permanent; everything
+  else (timeouts, connection errors, other HTTP statuses, pages that yield
+  an empty record, offline cache misses, parse worker crashes) is worth
+  another attempt later
+- DeadLetterStore: listings that failed for good, with the raw page kept
+  for debugging the parser; later runs skip the permanent failures
+  instead of paying for another hopeless fetch, and try the ones that only
+  ran out of transient attempts again
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+from parsers import RECORD_FIELDS, listing_key
+
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BACKOFF = 5.0  # seconds before the first re-attempt, doubled for each further one
+DEAD_LETTER_DIR = 'dead_letters'
+EMPTY_EXTRACTION = 'empty extraction'
+
+# Listing deleted or never existed (storage.GONE_ERRORS)
+PERMANENT_STATUSES = {404, 410}
+PARSE_ERROR = 'parse error'
+HTTP_ERROR_RE = re.compile(r'HTTP (\d{3})')
+
+DATA_FIELDS = [field for field in RECORD_FIELDS if field not in ('url', 'listing_id')]
+
+def error_text(exc):
+    """Record `error` for an exception, naming its type so it can be classified"""
+    return f"{type(exc).__name__}: {exc}"
+
+def parse_error_text(exc):
+    """Record `error` for an exception raised by the parser on a fetched page"""
+    return f"{PARSE_ERROR}: {error_text(exc)}"
+
+def empty_extraction(record):
+    """Nothing extracted at all (at most a bare 'AZN' price): a stub, challenge or truncated page"""
+    return not any((record.get(field) or '').strip(' AZN') for field in DATA_FIELDS)
+
+def classify_failure(record):
+    """(TRANSIENT or PERMANENT, reason) for a fetched record, or (None, None) if it succeeded"""
+    error = record.get('error')
+    if not error:
+        return (TRANSIENT, EMPTY_EXTRACTION) if empty_extraction(record) else (None, None)
+    match = HTTP_ERROR_RE.fullmatch(error)
+    if (match and int(match.group(1)) in PERMANENT_STATUSES) or error.startswith(PARSE_ERROR + ':'):
+        return PERMANENT, error
+    return TRANSIENT, error
+
+class DeadLetterStore:
+    """Permanently failed listings: <dir>/index.jsonl plus the raw page of each as <dir>/<name>.html.
+
+    The index is append-only; a later success appends a 'resolved' line
+    and deletes the page. Keys are parsers.listing_key values.
+    """
+
+    def __init__(self, directory=DEAD_LETTER_DIR):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index.jsonl')
+        self.entries = {}
+        self.added = 0
+
+    def load(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line
+                    if entry.get('resolved'):
+                        self.entries.pop(entry['key'], None)
+                    else:
+                        self.entries[entry['key']] = entry
+        return self
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def page_name(key):
+        return (key if key.isdigit() else hashlib.sha1(key.encode()).hexdigest()[:16]) + '.html'
+
+    def _append(self, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.index_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def hopeless(self):
+        """Keys of the listings that failed permanently, not worth fetching again"""
+        # Judged by the reason, not the stored kind, so entries follow the current classification
+        return {key for key, entry in self.entries.items()
+                if classify_failure({'error': entry['reason']})[0] == PERMANENT}
+
+    def add(self, url, kind, reason, attempts, content=None):
+        """Record a listing that failed for good, with its last response body if there was one"""
+        key = listing_key(url)
+        entry = {'key': key, 'url': url, 'kind': kind, 'reason': reason, 'attempts': attempts,
+                 'failed_at': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'), 'page': None}
+        if content:
+            entry['page'] = self.page_name(key)
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, entry['page']), 'wb') as f:
+                f.write(content)
+        self._append(entry)
+        self.entries[key] = entry
+        self.added += 1
+
+    def resolve(self, url):
+        """Forget a dead-lettered listing that has now been fetched successfully"""
+        entry = self.entries.pop(listing_key(url), None)
+        if entry:
+            self._append({'key': entry['key'], 'resolved': True})
+            if entry.get('page') and os.path.exists(os.path.join(self.directory, entry['page'])):
+                os.remove(os.path.join(self.directory, entry['page']))
@@ -6,299 +6,750 @@ FINAL COMPLETE SCRAPER - Combines all optimizations:
 - All fields populated maximally
 """
 
-import requests
-from bs4 import BeautifulSoup
+import argparse
+import contextlib
+import json
+import os
+import queue
+import threading
 import pandas as pd
 import time
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from http_session import (DEFAULT_CACHE_DIR, DEFAULT_CACHE_MAX_MB, DEFAULT_CACHE_TTL, DEFAULT_RETRIES,
+                          DEFAULT_TIMEOUT, HttpClient, ResponseCache, create_session, summarize_timings)
+from ratelimit import DEFAULT_MAX_RPS, DEFAULT_MIN_RPS, DEFAULT_RPS, AdaptiveRateLimiter
+from metrics import DEFAULT_INTERVAL, EXPORT_FORMATS, CrawlMetrics, MetricsExporter
+from normalize import UPDATED_FORMAT
+from storage import DEFAULT_DB, DEFAULT_PARQUET, ListingStore, export_parquet
+from failures import (DEAD_LETTER_DIR, DEFAULT_MAX_ATTEMPTS, DEFAULT_RETRY_BACKOFF, TRANSIENT,
+                      DeadLetterStore, classify_failure, error_text,
+                      parse_error_text)
+from parsers import BACKENDS, DEFAULT_BACKEND, listing_key, parse_car_page, parse_index_cards
+from parse_pool import DEFAULT_BATCH_SIZE, ParsePool
+from writers import DEFAULT_FLUSH_EVERY, OUTPUT_FIELDS, OUTPUT_FORMATS, open_writer
+
+BASE_URL = "https://www.avtovitrin.com"
+MAX_INDEX_PAGES = 100  # safety cap for pagination discovery
+MAX_FAILED_INDEX_PAGES = 3  # consecutive failed pages that end a walk without a pager
+# Output files are OUTPUT_BASE.<format>; --incremental reads the previous CSV
+OUTPUT_BASE = 'car_listings_final_complete'
+OUTPUT_CSV = OUTPUT_BASE + '.csv'
+# --new-only runs hold just the new listings, kept apart from the full output
+NEW_ONLY_OUTPUT_BASE = OUTPUT_BASE + '_new'
+DEFAULT_OUTPUT_FORMATS = ['csv', 'xlsx']
+
+# Streaming pipeline: bounded queues keep memory flat, rows are flushed in batches
+QUEUE_SIZE = 100
+
+# Append-only record of every fetched listing, replayed by --resume
+JOURNAL_PATH = '.crawl_journal.jsonl'
+
+# Keys of every listing fetched in any run, skipped by --new-only
+SEEN_INDEX_PATH = '.seen_listings'
+
+# Incremental mode: a listing is re-fetched when its index card shows a
+# different price/year/mileage; cards without them fall back to re-fetching
+# listings updated within DEFAULT_RECHECK_DAYS
+CARD_CHECK_FIELDS = ('price', 'year', 'mileage')
+DEFAULT_RECHECK_DAYS = 7
+
+# Crawl concurrency default (overridable from the command line)
+DEFAULT_WORKERS = 4
+
+def fetch_car_page(url, client):
+    """Raw detail page as (content, None), or (error body or None, error record) when it could not be fetched"""
+    try:
+        response = client.get(url)
+    except Exception as e:
+        return None, {'phone': '', 'owner': '', 'url': url, 'error': error_text(e)}
+    if response.status_code != 200:
+        return response.content, {'phone': '', 'owner': '', 'url': url, 'error': f'HTTP {response.status_code}'}
+    return response.content, None
 
-def extract_car_data_final(url):
-    """Final extraction using all proven techniques"""
+def parse_detail_page(content, url, backend=DEFAULT_BACKEND, timings=None):
     try:
-        response = requests.get(url, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        return parse_car_page(content, url, backend, timings)
+    except Exception as e:
+        return {'phone': '', 'owner': '', 'url': url, 'error': parse_error_text(e)}
+
+def observe_extraction(metrics, timings=None):
+    """Record parse/extract timings of one detail page"""
+    if not metrics:
+        return
+    for stage in ('parse', 'extract'):
+        if timings and stage in timings:
+            metrics.observe_stage(stage, timings[stage])
 
+def extract_car_data_final(url, client=None, backend=DEFAULT_BACKEND):
+    """Final extraction using all proven techniques"""
+    client = client or HttpClient()
+    content, record = fetch_car_page(url, client)
+    timings = {}
+    if record is None:
+        record = parse_detail_page(content, url, backend, timings)
+    observe_extraction(client.metrics, timings)
+    if client.metrics:
+        client.metrics.observe_record(record)
+    return record
+
+def fetch_index_page(client, base_url, page, backend=DEFAULT_BACKEND):
+    """Fetch one new-ads page; returns (cards, last_page) or (None, None) on error"""
+    url = f"{base_url}/new-ads.php?page={page}"
+    print(f"Getting URLs from page {page}...")
+    try:
+        response = client.get(url)
+        if response.status_code == 404:
+            if client.metrics and page > 1:
+                client.metrics.observe_expected_error(404)
+            return [], None  # past the last page
         if response.status_code != 200:
-            return {'phone': '', 'owner': '', 'url': url, 'error': f'HTTP {response.status_code}'}
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Initialize with phone/owner first as requested
-        data = {
-            'phone': '',
-            'owner': '',
-            'url': url,
-            'brand': '',
-            'model': '',
-            'price': '',
-            'city': '',
-            'year': '',
-            'body_type': '',
-            'color': '',
-            'engine_volume': '',
-            'engine_power': '',
-            'fuel_type': '',
-            'mileage': '',
-            'transmission': '',
-            'drivetrain': '',
-            'is_new': '',
-            'credit_available': '',
-            'barter_possible': '',
-            'views': '',
-            'updated': '',
-            'listing_id': ''
-        }
-
-        # Field mapping for car data - using EXACT text matching
-        field_mapping = {
-            'Şəhər': 'city',
-            'Marka': 'brand',
-            'Model': 'model',
-            'Buraxılış ili': 'year',
-            'Ban növü': 'body_type',
-            'Rəng': 'color',
-            'Mühərrikin həcmi': 'engine_volume',
-            'Mühərrikin gücü': 'engine_power',
-            'Yanacaq növü': 'fuel_type',
-            'Yürüş': 'mileage',
-            'Sürətlər qutusu': 'transmission',
-            'Ötürücü': 'drivetrain',
-            'Yeni': 'is_new',
-            'Kredit': 'credit_available',
-            'Barter mümkündür': 'barter_possible'
-        }
-
-        # ULTIMATE TEXT-BASED EXTRACTION (proven 100% success rate)
-        for field_name, data_key in field_mapping.items():
-            matching_elements = soup.find_all(string=lambda text: text and field_name in text)
-
-            for elem in matching_elements:
-                parent_td = elem.find_parent('td')
-                if parent_td:
-                    parent_row = parent_td.find_parent('tr')
-                    if parent_row:
-                        row_tds = parent_row.find_all('td')
-                        if len(row_tds) >= 2:
-                            for idx, td in enumerate(row_tds):
-                                if field_name in td.get_text():
-                                    if idx + 1 < len(row_tds):
-                                        value_td = row_tds[idx + 1]
-                                        link = value_td.find('a')
-                                        value = link.get_text(strip=True) if link else value_td.get_text(strip=True)
-                                        if value and value != field_name.replace(':', '') and not data[data_key]:
-                                            data[data_key] = value
-                                            break
-                    break
+            print(f"Error on page {page}: HTTP {response.status_code}")
+            return None, None
+        start = time.perf_counter()
+        cards, last_page = parse_index_cards(response.content, base_url, backend)
+        if client.metrics:
+            client.metrics.observe_stage('index_parse', time.perf_counter() - start)
+        return cards, last_page
+    except Exception as e:
+        print(f"Error on page {page}: {e}")
+        return None, None
+
+def get_all_urls(base_url=BASE_URL, max_pages=MAX_INDEX_PAGES, client=None, backend=DEFAULT_BACKEND,
+                 workers=DEFAULT_WORKERS, emit=None, status=None, skip=None):
+    """Get all car URLs from all pages.
+
+    The page count is read from the pager on page 1, and the remaining
+    pages are fetched concurrently in discovery order. Without a pager, or
+    past its last page, pages are walked one by one until a page adds no new
+    listings. A failed page past the pager's last one ends the walk like an
+    empty page; without a pager the walk gives up after
+    MAX_FAILED_INDEX_PAGES failures in a row. Listings are told apart by listing_key, so URL variants of
+    one listing count once. `emit`, if given, is called with the card
+    (partial record, see parsers.CARD_FIELDS) of each new listing as soon
+    as its page is parsed, except for listings whose key is in `skip`.
+    `status['complete']`, if given, is set to whether every index page was
+    read without errors and without being cut off by `max_pages`, and
+    `status['skipped']` to the keys of the listings not emitted.
+    """
+    client = client or HttpClient()
+    all_urls = {}  # listing_key -> URL, in discovery order
+    complete = True
+    skipped = []
+
+    def add(page, page_cards):
+        nonlocal complete
+        if page_cards is None:
+            complete = False
+        new = []
+        for card in page_cards or []:
+            key = listing_key(card['url'])
+            if key not in all_urls:
+                all_urls[key] = card['url']
+                new.append(card)
+        if emit:
+            for card in new:
+                if skip and listing_key(card['url']) in skip:
+                    skipped.append(listing_key(card['url']))
+                else:
+                    emit(card)
+        if page_cards is not None:
+            print(f"Found {len(page_cards)} URLs on page {page} ({len(new)} new)")
+        return new
+
+    page_cards, last_page = fetch_index_page(client, base_url, 1, backend)
+    add(1, page_cards)
+    page = 1
+    failed = 0  # consecutive failed pages in the sequential walk
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while page < max_pages:
+            if last_page and last_page > page:
+                # Page count known from the pager: fetch the rest in parallel
+                batch = list(range(page + 1, min(last_page, max_pages) + 1))
+                pages = executor.map(lambda p: fetch_index_page(client, base_url, p, backend), batch)
+                for page, (page_cards, pager_last) in zip(batch, pages):
+                    add(page, page_cards)
+                    last_page = max(last_page, pager_last or 0)
+                continue
 
-        # MULTI-METHOD PRICE EXTRACTION
-        price_methods = [
-            # Method 1: Standard price element
-            lambda: soup.find('td', class_='rowone price_car1'),
-            # Method 2: Alternative price element
-            lambda: soup.find('td', class_='rowone price_car'),
-            # Method 3: Any element with 'price' in class
-            lambda: soup.find('td', class_=lambda x: x and 'price' in str(x).lower()),
-            # Method 4: Text containing AZN (concise)
-            lambda: next((elem for elem in soup.find_all(string=lambda text: text and 'AZN' in text)
-                        if len(elem.strip().split()) <= 3), None),
-        ]
-
-        for method in price_methods:
-            try:
-                result = method()
-                if result:
-                    if hasattr(result, 'get_text'):
-                        price_text = result.get_text(strip=True)
-                    else:
-                        price_text = result.strip()
-
-                    if price_text and 'AZN' in price_text and not data['price']:
-                        data['price'] = price_text
-                        break
-            except:
+            # No pager (or past its end): walk until a page adds nothing new
+            page += 1
+            page_cards, pager_last = fetch_index_page(client, base_url, page, backend)
+            if page_cards is None:
+                if last_page:
+                    break  # past the pager's last page: the end of the listing, not a gap in it
+                add(page, None)
+                failed += 1
+                if failed >= MAX_FAILED_INDEX_PAGES:
+                    break
                 continue
+            failed = 0
+            last_page = max(last_page or 0, pager_last or 0)
+            if not add(page, page_cards):
+                break
+        else:
+            # Stopped by max_pages: complete only if the pager ends there
+            complete = complete and last_page is not None and last_page <= max_pages
+
+    unique_urls = list(all_urls.values())
+    print(f"Total unique URLs: {len(unique_urls)}"
+          + (f" ({len(skipped)} skipped)" if skipped else ""))
+    if status is not None:
+        status['complete'] = complete and bool(unique_urls)
+        status['skipped'] = skipped
+    return unique_urls
 
-        # MULTI-METHOD CONTACT EXTRACTION
-        contact_table = soup.find('table', class_='table1')
-        if contact_table:
-            # Owner name
-            owner_elem = contact_table.find('td', class_='rowone')
-            if owner_elem:
-                owner_text = owner_elem.get_text(strip=True)
-                if owner_text and 'AZN' not in owner_text and len(owner_text) < 50:
-                    data['owner'] = owner_text
-
-            # Phone number - multiple methods
-            phone_methods = [
-                lambda: contact_table.find('td', class_='row_phone_number'),
-                lambda: contact_table.find('td', string=lambda text: text and '(' in text and ')' in text and any(c.isdigit() for c in text)),
-                lambda: next((elem for elem in contact_table.find_all(string=lambda text: text and '(' in text and ')' in text and len([c for c in text if c.isdigit()]) >= 7)), None)
-            ]
-
-            for method in phone_methods:
+def load_previous_results(path=OUTPUT_CSV):
+    """Previous run's records indexed by listing_id (falling back to URL)"""
+    if not os.path.exists(path):
+        return {}
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    previous = {}
+    for record in df.to_dict('records'):
+        record['url'] = record['url'].strip()
+        if not record.get('error'):
+            record.pop('error', None)
+        key = record.get('listing_id') or listing_key(record['url'])
+        previous[key] = record
+    return previous
+
+def failed_extraction(record):
+    """Failed or empty extractions are always fetched again"""
+    return 'error' in record or not record.get('brand') or not record.get('price', '').strip(' AZN')
+
+def needs_recheck(record, recheck_days, today=None):
+    """Whether a previously scraped listing could have changed since then.
+
+    Failed or empty extractions are always retried. Otherwise a listing is
+    re-fetched only if its `updated` date is recent (the seller is active
+    and may edit it again) or cannot be read.
+    """
+    if failed_extraction(record):
+        return True
+    try:
+        updated = datetime.strptime(record.get('updated', ''), UPDATED_FORMAT)
+    except ValueError:
+        return True
+    today = today or datetime.now()
+    return today - updated <= timedelta(days=recheck_days)
+
+def digits(text):
+    return ''.join(c for c in text or '' if c.isdigit())
+
+def card_differs(card, record):
+    """Index-card comparison: True/False when the card shows a price, year or
+    mileage to check against the previous record, None when it shows none"""
+    shown = [field for field in CARD_CHECK_FIELDS if digits(card.get(field))]
+    if not shown:
+        return None
+    return any(digits(card[field]) != digits(record.get(field)) for field in shown)
+
+def reusable_record(card, previous, recheck_days=DEFAULT_RECHECK_DAYS):
+    """Previous record for an index card's listing if it can be reused without a fetch, else None.
+
+    A card showing price/year/mileage decides on its own: the listing is
+    re-fetched only if one of them changed. Cards without them fall back
+    to the `updated`-date heuristic of needs_recheck.
+    """
+    url = card['url']
+    record = previous.get(listing_key(url)) or previous.get(url)
+    if record is None or failed_extraction(record):
+        return None
+    differs = card_differs(card, record)
+    if differs or (differs is None and needs_recheck(record, recheck_days)):
+        return None
+    return dict(record, url=url)
+
+def report_progress(i, url, data):
+    """Print one progress line for a finished listing"""
+    print(f"Processing {i}: {url.split('/')[-1]}")
+
+    # Show detailed progress
+    if 'error' not in data:
+        phone = data.get('phone', 'MISSING')[:15] + '...' if len(data.get('phone', '')) > 15 else data.get('phone', 'MISSING')
+        owner = data.get('owner', 'MISSING')[:10] + '...' if len(data.get('owner', '')) > 10 else data.get('owner', 'MISSING')
+        brand = data.get('brand', 'MISSING')
+        model = data.get('model', 'MISSING')
+        price = data.get('price', 'MISSING')
+
+        # Count filled fields
+        filled = sum(1 for k, v in data.items() if k not in ['url', 'error'] and v and v != '')
+        total_fields = len(data) - 1  # Exclude url
+        completion = f"{filled}/{total_fields} ({filled/total_fields*100:.0f}%)"
+
+        print(f"  ✓ {phone} | {owner} | {brand} {model} | {price} | {completion}")
+    else:
+        print(f"  ✗ Error: {data['error']}")
+
+class CrawlStats:
+    """Running success and field-completion counters (no per-record storage)"""
+
+    REPORTED_FIELDS = ['phone', 'owner', 'brand', 'model', 'price', 'city', 'year', 'engine_volume']
+
+    def __init__(self):
+        self.processed = 0
+        self.successful = 0
+        self.reused = 0
+        self.field_filled = dict.fromkeys(self.REPORTED_FIELDS, 0)
+        self.total_fields = 0
+        self.filled_fields = 0
+
+    def add(self, data, reused=False):
+        self.processed += 1
+        self.reused += reused
+        if 'error' in data:
+            return
+        self.successful += 1
+        for field in self.REPORTED_FIELDS:
+            if data.get(field):
+                self.field_filled[field] += 1
+        for k, v in data.items():
+            if k not in ['url', 'error']:
+                self.total_fields += 1
+                if v and v != '':
+                    self.filled_fields += 1
+
+    def report(self):
+        print(f"\nFINAL RESULTS:")
+        print(f"Total processed: {self.processed} ({self.reused} reused without fetching)")
+        print(f"Successful extractions: {self.successful}")
+        if not self.processed:
+            return
+        print(f"Success rate: {self.successful/self.processed*100:.1f}%")
+
+        if self.successful:
+            print(f"\nField completion rates:")
+            for field, filled in self.field_filled.items():
+                print(f"  {field}: {filled}/{self.successful} ({filled/self.successful*100:.0f}%)")
+
+            overall_completion = self.filled_fields / self.total_fields * 100
+            print(f"\nOverall completion rate: {overall_completion:.1f}%")
+
+class CrawlJournal:
+    """Append-only JSONL checkpoint: one {"url", "record"} line per fetched listing.
+
+    Lines are flushed as they are written and fsynced every `sync_every`
+    records; a torn last line from a crash is ignored on load and cut off
+    when the journal is reopened to resume. The journal is deleted once a
+    crawl finishes cleanly.
+    """
+
+    def __init__(self, path=JOURNAL_PATH, sync_every=DEFAULT_FLUSH_EVERY):
+        self.path = path
+        self.sync_every = sync_every
+        self.entries = 0
+        self.file = None
+
+    def load(self):
+        """Records of a previous interrupted crawl, keyed by URL"""
+        finished = {}
+        if not os.path.exists(self.path):
+            return finished
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
                 try:
-                    result = method()
-                    if result:
-                        if hasattr(result, 'get_text'):
-                            phone_text = result.get_text(strip=True)
-                        else:
-                            phone_text = result.strip()
-
-                        if phone_text and '(' in phone_text and ')' in phone_text and not data['phone']:
-                            data['phone'] = phone_text
-                            break
-                except:
+                    entry = json.loads(line)
+                except ValueError:
                     continue
-
-            # Additional contact info using text matching
-            contact_fields = {
-                'Baxışların sayı': 'views',
-                'Yeniləndi': 'updated',
-                'nömrəsi': 'listing_id'
-            }
-
-            for field_name, data_key in contact_fields.items():
-                matching_elements = contact_table.find_all(string=lambda text: text and field_name in text)
-                for elem in matching_elements:
-                    parent_td = elem.find_parent('td')
-                    if parent_td:
-                        parent_row = parent_td.find_parent('tr')
-                        if parent_row:
-                            row_tds = parent_row.find_all('td')
-                            if len(row_tds) >= 2:
-                                for idx, td in enumerate(row_tds):
-                                    if field_name in td.get_text():
-                                        if idx + 1 < len(row_tds):
-                                            value_td = row_tds[idx + 1]
-                                            value = value_td.get_text(strip=True)
-                                            if value and value != field_name.replace(':', '') and not data[data_key]:
-                                                data[data_key] = value
-                                                break
-                        break
-
-        return data
-
-    except Exception as e:
-        return {'phone': '', 'owner': '', 'url': url, 'error': str(e)}
-
-def get_all_urls():
-    """Get all car URLs from all pages"""
-    base_url = "https://www.avtovitrin.com"
-    all_urls = []
-
-    for page in range(1, 13):
-        url = f"{base_url}/new-ads.php?page={page}"
-        print(f"Getting URLs from page {page}...")
-
+                finished[entry['url']] = entry['record']
+        return finished
+
+    def open(self, resume=False):
+        if resume and os.path.exists(self.path):
+            self._truncate_torn_line()
+        self.file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _truncate_torn_line(self, chunk_size=4096):
+        """Cut the file after its last newline, so the next entry is not glued onto a torn one"""
+        with open(self.path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(end - chunk_size, 0)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    f.truncate(start + newline + 1)
+                    return
+                end = start
+            f.truncate(0)
+
+    def append(self, url, record):
+        self.file.write(json.dumps({'url': url, 'record': record}, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.entries += 1
+        if self.entries % self.sync_every == 0:
+            os.fsync(self.file.fileno())
+
+    def close(self, completed=False):
+        if self.file:
+            self.file.close()
+            self.file = None
+        if completed and os.path.exists(self.path):
+            os.remove(self.path)
+
+class SeenIndex:
+    """Persistent set of listing keys (parsers.listing_key) fetched in any run.
+
+    Loaded into memory at start (a hash set is small at marketplace
+    scale) and used as a sink: every successfully extracted record adds
+    its key, appended to the file and flushed at once, so the index
+    survives a crash. Failed fetches are not added and are tried again.
+    """
+
+    def __init__(self, path=SEEN_INDEX_PATH):
+        self.path = path
+        self.keys = set()
+        self.added = 0
+        self.file = None
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                self.keys.update(line.strip() for line in f if line.strip())
+        return self
+
+    def __contains__(self, key):
+        return key in self.keys
+
+    def __len__(self):
+        return len(self.keys)
+
+    def open(self):
+        self.file = open(self.path, 'a', encoding='utf-8')
+        return self
+
+    def write(self, record):
+        if record.get('error'):
+            return
+        key = listing_key(record['url'])
+        if key not in self.keys:
+            self.keys.add(key)
+            self.file.write(key + '\n')
+            self.file.flush()
+            self.added += 1
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+def crawl(args, client, sinks, stats, previous=None, journal=None, finished=None, discovery=None, skip=None,
+          dead_letters=None):
+    """Streaming crawl: discovery -> card queue -> detail workers -> record queue -> sinks.
+
+    Index pages feed listing cards into a bounded queue while they are
+    still being discovered, detail workers turn them into records (reusing
+    `previous` ones the card shows unchanged; with --parse-workers they
+    only fetch and a process pool parses), and this thread hands each
+    record to every sink (output writers, listing store) as it arrives and
+    checkpoints fetched ones to the journal. URLs already in `finished` (a
+    resumed journal) are not fetched again, nor are listings whose key is
+    in `skip`. `discovery` receives get_all_urls' completeness status.
+
+    Fetches that fail transiently (see failures.classify_failure) are held
+    back and fetched again after discovery is done, in further passes with
+    exponential backoff, up to --max-attempts in all. Listings that fail
+    permanently or run out of attempts are written with their error and
+    added to `dead_letters` along with the last page received.
+    Returns the list of discovered URLs.
+    """
+    workers = max(1, args.workers)
+    finished = finished or {}
+    discovered = []
+    record_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    attempts = {}  # url -> fetches so far
+    retries = []   # (not before, card) of transient failures awaiting the next pass
+    in_pool = {}   # url -> card of pages being parsed in the pool
+
+    def parsed(url, record, timings, content):
+        observe_extraction(client.metrics, timings)
+        record_queue.put((in_pool.pop(url), record, False, content))
+
+    # Optional process pool: detail workers only fetch, pages are parsed in other processes
+    pool = None
+    if args.parse_workers > 0:
+        pool = ParsePool(args.parse_workers, parsed, args.parser, args.parse_batch)
+
+    def detail_worker(card_queue):
         try:
-            response = requests.get(url, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-            })
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-            cars_items = soup.find_all('div', class_='cars__item')
+            while True:
+                card = card_queue.get()
+                if card is None:
+                    break
+                url = card['url']
+                record = finished.get(url)
+                if record is None and previous:
+                    record = reusable_record(card, previous, args.recheck_days)
+                if record is not None:
+                    record_queue.put((card, record, True, None))
+                    continue
+                content, record = fetch_car_page(url, client)
+                if record is None and pool:
+                    in_pool[url] = card
+                    pool.submit(url, content)
+                    continue
+                if record is None:
+                    timings = {}
+                    record = parse_detail_page(content, url, args.parser, timings)
+                    observe_extraction(client.metrics, timings)
+                record_queue.put((card, record, False, content))
+        finally:
+            record_queue.put(None)
+
+    def handle(card, record, reused, content):
+        url = card['url']
+        if not reused:
+            attempt = attempts[url] = attempts.get(url, 0) + 1
+            kind, reason = classify_failure(record)
+            if kind == TRANSIENT and attempt < args.max_attempts:
+                retries.append((time.monotonic() + args.retry_backoff * 2 ** (attempt - 1), card))
+                print(f"Will retry {url}: {reason} (attempt {attempt} of {args.max_attempts})")
+                return
+            if kind:
+                record.setdefault('error', reason)
+                if dead_letters is not None:
+                    dead_letters.add(url, kind, reason, attempt, content)
+            elif dead_letters is not None and listing_key(url) in dead_letters:
+                dead_letters.resolve(url)
+            if client.metrics:
+                client.metrics.observe_record(record)
+        for sink in sinks:
+            sink.write(record)
+        if journal and not reused:
+            journal.append(url, record)
+        stats.add(record, reused)
+        if not reused:
+            report_progress(stats.processed, url, record)
+
+    def run_pass(feed):
+        """Fetch every card `feed(put)` puts, handling records as they arrive"""
+        card_queue = queue.Queue(maxsize=QUEUE_SIZE)
+
+        def produce():
+            try:
+                feed(card_queue.put)
+            finally:
+                for _ in range(workers):
+                    card_queue.put(None)
 
-            page_urls = []
-            for item in cars_items:
-                link = item.find('a', href=True)
-                if link and 'cars/' in link['href']:
-                    full_url = urljoin(base_url, link['href'])
-                    page_urls.append(full_url)
+        def drain_pool():
+            # Records still in the pool arrive after the detail workers are done
+            try:
+                for thread in fetchers:
+                    thread.join()
+                pool.drain()
+            finally:
+                record_queue.put(None)
+
+        fetchers = [threading.Thread(target=detail_worker, args=(card_queue,), name=f'detail-{i}', daemon=True)
+                    for i in range(workers)]
+        threads = [threading.Thread(target=produce, name='feed', daemon=True)] + fetchers
+        if pool:
+            threads.append(threading.Thread(target=drain_pool, name='parse-drain', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        producers = workers + (1 if pool else 0)
+        finished_workers = 0
+        while finished_workers < producers:
+            item = record_queue.get()
+            if item is None:
+                finished_workers += 1
+                continue
+            handle(*item)
 
-            print(f"Found {len(page_urls)} URLs on page {page}")
-            all_urls.extend(page_urls)
-            time.sleep(1)
+        for thread in threads:
+            thread.join()
 
-        except Exception as e:
-            print(f"Error on page {page}: {e}")
+    def discover(put):
+        discovered.extend(get_all_urls(args.base_url, args.max_pages, client, args.parser,
+                                       workers, emit=put, status=discovery, skip=skip))
 
-    unique_urls = list(set(all_urls))
-    print(f"Total unique URLs: {len(unique_urls)}")
-    return unique_urls
+    def retry(due):
+        def feed(put):
+            for not_before, card in due:
+                time.sleep(max(0.0, not_before - time.monotonic()))
+                put(card)
+        return feed
 
-def main():
+    try:
+        run_pass(discover)
+        while retries:
+            due = sorted(retries, key=lambda item: item[0])
+            retries.clear()
+            print(f"\nRetrying {len(due)} listings after transient failures...")
+            run_pass(retry(due))
+    finally:
+        if pool:
+            pool.close()
+    return discovered
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape car listings from avtovitrin.com")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"concurrent detail-page fetches (default {DEFAULT_WORKERS})")
+    parser.add_argument('--rps', type=float, default=DEFAULT_RPS,
+                        help=f"starting requests per second per host, 0 disables rate limiting (default {DEFAULT_RPS})")
+    parser.add_argument('--min-rps', type=float, default=DEFAULT_MIN_RPS,
+                        help=f"floor the rate backs off to on 429/503, timeouts or slow responses (default {DEFAULT_MIN_RPS})")
+    parser.add_argument('--max-rps', type=float, default=DEFAULT_MAX_RPS,
+                        help=f"ceiling the rate grows to while the server keeps up (default {DEFAULT_MAX_RPS})")
+    parser.add_argument('--base-url', default=BASE_URL,
+                        help="site root, e.g. a local stand-in serving saved pages")
+    parser.add_argument('--max-pages', type=int, default=MAX_INDEX_PAGES,
+                        help=f"upper bound on new-ads index pages to walk (default {MAX_INDEX_PAGES})")
+    parser.add_argument('--timeout', type=float, nargs=2, default=DEFAULT_TIMEOUT,
+                        metavar=('CONNECT', 'READ'),
+                        help=f"connect and read timeouts in seconds (default {DEFAULT_TIMEOUT[0]} {DEFAULT_TIMEOUT[1]})")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f"retries on 429/5xx and connection errors (default {DEFAULT_RETRIES})")
+    parser.add_argument('--parser', choices=sorted(BACKENDS), default=DEFAULT_BACKEND,
+                        help=f"HTML parser backend (default {DEFAULT_BACKEND})")
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help="fetches of a listing that fails transiently (timeout, 429/5xx, empty page) before "
+                             f"giving up; re-attempts run after discovery (default {DEFAULT_MAX_ATTEMPTS})")
+    parser.add_argument('--retry-backoff', type=float, default=DEFAULT_RETRY_BACKOFF,
+                        help="seconds before the first re-attempt, doubled for each further one "
+                             f"(default {DEFAULT_RETRY_BACKOFF:g})")
+    parser.add_argument('--dead-letters', default=DEAD_LETTER_DIR,
+                        help=f"directory for listings that failed for good, with their raw pages (default {DEAD_LETTER_DIR})")
+    parser.add_argument('--retry-dead', action='store_true',
+                        help="fetch listings that failed permanently in earlier runs again instead of skipping them")
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help="parse detail pages in N worker processes (default 0: in the fetch threads)")
+    parser.add_argument('--parse-batch', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"pages sent to a parse worker at a time (default {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f"on-disk response cache directory (default {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--no-cache', action='store_true', help="disable the response cache")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_CACHE_TTL,
+                        help="seconds a cached page is reused without revalidation "
+                             f"(default {DEFAULT_CACHE_TTL}: always revalidate with If-None-Match/If-Modified-Since)")
+    parser.add_argument('--cache-max-mb', type=float, default=DEFAULT_CACHE_MAX_MB,
+                        help=f"cache size limit, least recently used pages are evicted (default {DEFAULT_CACHE_MAX_MB})")
+    parser.add_argument('--offline', action='store_true',
+                        help="never touch the network, serve every page from the cache")
+    parser.add_argument('--formats', nargs='+', choices=OUTPUT_FORMATS, default=DEFAULT_OUTPUT_FORMATS,
+                        help=f"output files written as records arrive, {OUTPUT_BASE}.<format> "
+                             f"(default {' '.join(DEFAULT_OUTPUT_FORMATS)})")
+    parser.add_argument('--flush-every', type=int, default=DEFAULT_FLUSH_EVERY,
+                        help=f"flush CSV/JSONL output every N records (default {DEFAULT_FLUSH_EVERY})")
+    parser.add_argument('--db', default=DEFAULT_DB,
+                        help=f"SQLite listing store, upserted by listing_id across runs (default {DEFAULT_DB})")
+    parser.add_argument('--no-db', action='store_true', help="do not update the SQLite listing store")
+    parser.add_argument('--parquet', default=DEFAULT_PARQUET,
+                        help=f"typed Parquet export of the listing store (default {DEFAULT_PARQUET})")
+    parser.add_argument('--resume', action='store_true',
+                        help=f"continue an interrupted crawl, skipping listings already in {JOURNAL_PATH}")
+    parser.add_argument('--metrics-out', metavar='PATH',
+                        help="export live crawl metrics to PATH while running")
+    parser.add_argument('--metrics-format', choices=EXPORT_FORMATS, default=None,
+                        help="prometheus text (rewritten in place) or jsonl snapshots (appended); "
+                             "default prometheus for *.prom paths, else jsonl")
+    parser.add_argument('--metrics-interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f"seconds between metrics exports (default {DEFAULT_INTERVAL:g})")
+    parser.add_argument('--new-only', action='store_true',
+                        help=f"only fetch listings never fetched before (keys recorded in {SEEN_INDEX_PATH}); "
+                             f"and write them to {NEW_ONLY_OUTPUT_BASE}.<format>, leaving the full output untouched")
+    parser.add_argument('--incremental', action='store_true',
+                        help=f"reuse unchanged listings from the previous {OUTPUT_CSV}, fetch only new/changed ones")
+    parser.add_argument('--recheck-days', type=int, default=DEFAULT_RECHECK_DAYS,
+                        help=f"incremental mode: re-fetch listings updated within N days when their "
+                             f"index card shows no price/year/mileage (default {DEFAULT_RECHECK_DAYS})")
+    args = parser.parse_args(argv)
+    if args.incremental and 'csv' not in args.formats:
+        parser.error("--incremental compares against the previous CSV, keep csv in --formats")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
     print("Starting FINAL COMPLETE scraper with proven 100% extraction...")
-
-    # Get all URLs
-    all_urls = get_all_urls()
-
-    # Extract data from each URL with final method
-    print(f"\nExtracting COMPLETE data from {len(all_urls)} URLs...")
-    results = []
-
-    for i, url in enumerate(all_urls, 1):
-        print(f"Processing {i}/{len(all_urls)}: {url.split('/')[-1]}")
-
-        data = extract_car_data_final(url)
-        results.append(data)
-
-        # Show detailed progress
-        if 'error' not in data:
-            phone = data.get('phone', 'MISSING')[:15] + '...' if len(data.get('phone', '')) > 15 else data.get('phone', 'MISSING')
-            owner = data.get('owner', 'MISSING')[:10] + '...' if len(data.get('owner', '')) > 10 else data.get('owner', 'MISSING')
-            brand = data.get('brand', 'MISSING')
-            model = data.get('model', 'MISSING')
-            price = data.get('price', 'MISSING')
-
-            # Count filled fields
-            filled = sum(1 for k, v in data.items() if k not in ['url', 'error'] and v and v != '')
-            total = len(data) - 1  # Exclude url
-            completion = f"{filled}/{total} ({filled/total*100:.0f}%)"
-
-            print(f"  ✓ {phone} | {owner} | {brand} {model} | {price} | {completion}")
-        else:
-            print(f"  ✗ Error: {data['error']}")
-
-        time.sleep(1.5)
-
-    # Calculate comprehensive statistics
-    successful = [r for r in results if 'error' not in r]
-
-    print(f"\nFINAL RESULTS:")
-    print(f"Total processed: {len(results)}")
-    print(f"Successful extractions: {len(successful)}")
-    print(f"Success rate: {len(successful)/len(results)*100:.1f}%")
-
-    if successful:
-        # Field completion analysis
-        field_stats = {}
-        for field in ['phone', 'owner', 'brand', 'model', 'price', 'city', 'year', 'engine_volume']:
-            filled = sum(1 for r in successful if r.get(field) and r[field] != '')
-            field_stats[field] = f"{filled}/{len(successful)} ({filled/len(successful)*100:.0f}%)"
-
-        print(f"\nField completion rates:")
-        for field, rate in field_stats.items():
-            print(f"  {field}: {rate}")
-
-        # Overall completion rate
-        total_fields = 0
-        filled_fields = 0
-        for result in successful:
-            for k, v in result.items():
-                if k not in ['url', 'error']:
-                    total_fields += 1
-                    if v and v != '':
-                        filled_fields += 1
-
-        overall_completion = filled_fields / total_fields * 100
-        print(f"\nOverall completion rate: {overall_completion:.1f}%")
-
-    # Create DataFrame with phone/owner first columns
-    df = pd.DataFrame(results)
-
-    # Reorder columns to put phone and owner first as requested
-    cols = df.columns.tolist()
-    ordered_cols = ['phone', 'owner'] + [col for col in cols if col not in ['phone', 'owner']]
-    df = df[ordered_cols]
-
-    # Save results
-    df.to_csv('car_listings_final_complete.csv', index=False, encoding='utf-8')
-    df.to_excel('car_listings_final_complete.xlsx', index=False, engine='openpyxl')
+    throttle = AdaptiveRateLimiter(args.rps, args.min_rps, args.max_rps) if args.rps > 0 else None
+    session = create_session(pool_size=max(args.workers, 1), retries=args.retries)
+    cache = None
+    if args.offline or not args.no_cache:
+        cache = ResponseCache(args.cache_dir, args.cache_ttl, int(args.cache_max_mb * 1024 * 1024), args.offline)
+    metrics = CrawlMetrics()
+    client = HttpClient(session, tuple(args.timeout), throttle, cache, metrics, args.retries)
+    exporter = None
+    if args.metrics_out:
+        fmt = args.metrics_format or ('prometheus' if args.metrics_out.endswith('.prom') else 'jsonl')
+        exporter = MetricsExporter(metrics, args.metrics_out, fmt, args.metrics_interval).start()
+
+    # Incremental mode: only fetch listings that are new or may have changed
+    previous = load_previous_results(OUTPUT_CSV) if args.incremental else None
+
+    # Stream URLs -> records -> output files; .partial files survive a crash mid-run
+    print(f"\nExtracting COMPLETE data with {args.workers} workers as URLs are discovered...")
+    stats = CrawlStats()
+    journal = CrawlJournal(JOURNAL_PATH, args.flush_every)
+    finished = journal.load() if args.resume else {}
+    if args.resume:
+        print(f"Resuming: {len(finished)} listings already done in {JOURNAL_PATH}")
+    journal.open(resume=args.resume)
+
+    store = None if args.no_db else ListingStore(args.db)
+    seen = SeenIndex(SEEN_INDEX_PATH).load().open()
+    dead_letters = DeadLetterStore(args.dead_letters).load()
+    # Listings not fetched this run: permanent failures of earlier runs, and with --new-only any seen before
+    skip = set() if args.retry_dead else dead_letters.hopeless()
+    if args.new_only:
+        skip |= seen.keys
+    discovery = {}
+    try:
+        with contextlib.ExitStack() as outputs:
+            output_base = NEW_ONLY_OUTPUT_BASE if args.new_only else OUTPUT_BASE
+            writers = [outputs.enter_context(open_writer(fmt, output_base, OUTPUT_FIELDS, args.flush_every))
+                       for fmt in dict.fromkeys(args.formats)]
+            sinks = writers + ([store] if store else []) + [seen]
+            all_urls = crawl(args, client, sinks, stats, previous, journal, finished, discovery, skip, dead_letters)
+        # Skipped listings are still listed; only a crawl that saw every listing can tell one is gone
+        if store:
+            store.mark_listed(discovery.get('skipped', []))
+            if discovery.get('complete'):
+                store.mark_removed()
+    finally:
+        seen.close()
+        journal.close()
+        if store:
+            store.close()
+        if exporter:
+            exporter.stop()
+    journal.close(completed=True)
+
+    if previous is not None:
+        current = {listing_key(url) for url in all_urls}
+        gone = sum(1 for key in previous if key not in current)
+        print(f"\nIncremental: {len(previous)} previous listings, {stats.reused} unchanged, "
+              f"{stats.processed - stats.reused} new or re-checked, {gone} no longer listed")
+
+    stats.report()
+
+    print(f"\nHTTP timings: {summarize_timings(session.timings)}")
+    snapshot = metrics.snapshot()
+    print(f"Throughput: {snapshot['pages_per_second']:.1f} pages/s, "
+          f"error rate {snapshot['error_rate']:.1%} of {snapshot['requests']} requests")
+    if throttle:
+        print(f"Rate limiter: {throttle.summary()}")
+    if cache:
+        print(f"Response cache: {cache.stats()}")
+    print(f"Seen index: {len(seen)} listings ({seen.added} added this run)")
+    print(f"Dead letters: {len(dead_letters)} listings in {args.dead_letters} ({dead_letters.added} added this run, "
+          f"{len(dead_letters.hopeless())} permanent failures not fetched again without --retry-dead)")
+    if store:
+        print(f"Listing store changes: {store.summary()}"
+              + ("" if discovery.get('complete') else " (discovery incomplete, removals not checked)"))
 
     print(f"\nFiles saved with phone/owner as first columns:")
-    print(f"- car_listings_final_complete.csv ({len(df)} entries)")
-    print(f"- car_listings_final_complete.xlsx ({len(df)} entries)")
+    for writer in writers:
+        print(f"- {writer.path} ({writer.rows} entries)")
+
+    if store:
+        exported = export_parquet(args.db, args.parquet)
+        if exported is not None:
+            print(f"- {args.parquet} ({exported} listings from {args.db})")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
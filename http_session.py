@@ -0,0 +1,366 @@
+"""
+Shared HTTP transport for the scraper:
+- One pooled keep-alive session reused by index and detail fetches
+- gzip/deflate (and brotli when installed) negotiation
+- Connect/read timeouts and exponential backoff on 5xx
+- 429/503 surfaced to the crawl's rate limiter (see ratelimit.py) and retried through it
+- Per-request timings (DNS vs. connect/TLS handshake vs. first byte vs. transfer)
+- Persistent response cache with ETag/Last-Modified revalidation
+"""
+
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.exceptions import NameResolutionError, NewConnectionError
+from urllib3.util import Retry, make_headers
+
+from ratelimit import RATE_LIMIT_STATUSES, retry_after_seconds
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# (connect, read) seconds - a hung socket must never stall the crawl
+DEFAULT_TIMEOUT = (5, 20)
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+# Retried inside urllib3; RATE_LIMIT_STATUSES are left to HttpClient so the
+# rate limiter sees every one of them
+RETRY_STATUSES = (500, 502, 504)
+
+# DNS and connect time of the request currently running on this thread
+_connect_timing = threading.local()
+
+def _record_timing(stage, seconds):
+    setattr(_connect_timing, stage, getattr(_connect_timing, stage, 0.0) + seconds)
+
+class TimedConnectionMixin:
+    """Resolves the host itself so DNS time is recorded apart from connect()"""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        _record_timing('dns', time.perf_counter() - start)
+
+        host, error = self._dns_host, None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except NewConnectionError as e:
+                    error = e
+            raise error
+        finally:
+            self._dns_host = host
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        _record_timing('connect', time.perf_counter() - start)
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    """HTTP connection that records DNS and connect() time"""
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    """HTTPS connection that records DNS and TCP connect plus TLS handshake time"""
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools hand out connections with connect timing"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+def create_session(pool_size=DEFAULT_POOL_SIZE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """Build a keep-alive session with connection pooling and retry/backoff"""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=False,  # Retry-After is the rate limiter's job
+        raise_on_status=False,
+    )
+    adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(make_headers(keep_alive=True, accept_encoding=True))
+    session.headers['User-Agent'] = USER_AGENT
+    session.timings = TimingTotals()
+    return session
+
+_default_session = None
+_default_session_lock = threading.Lock()
+
+def get_session():
+    """Return the process-wide shared session, creating it on first use"""
+    global _default_session
+    with _default_session_lock:
+        if _default_session is None:
+            _default_session = create_session()
+        return _default_session
+
+def fetch(url, session=None, timeout=DEFAULT_TIMEOUT, **kwargs):
+    """GET `url` through the shared session and attach per-request timings.
+
+    `response.timings` holds seconds spent resolving the host and in
+    connect (TCP + TLS; both 0 on a reused keep-alive connection), waiting
+    for the first byte after connecting, downloading the body, and in total.
+    """
+    session = session or get_session()
+    _connect_timing.dns = _connect_timing.connect = 0.0
+    start = time.perf_counter()
+    response = session.get(url, timeout=timeout, **kwargs)
+    total = time.perf_counter() - start
+
+    dns = _connect_timing.dns
+    connect = max(_connect_timing.connect - dns, 0.0)
+    headers_at = response.elapsed.total_seconds()
+    response.timings = {
+        'dns': dns,
+        'connect': connect,
+        'ttfb': max(headers_at - dns - connect, 0.0),
+        'download': max(total - headers_at, 0.0),
+        'total': total,
+        'reused': connect == 0.0 and dns == 0.0,
+    }
+    if hasattr(session, 'timings'):
+        session.timings.add(response.timings)
+    return response
+
+class TimingTotals:
+    """Running sums of fetch() timings per session: constant memory however long the crawl"""
+
+    STAGES = ('dns', 'connect', 'ttfb', 'download', 'total')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.reused = 0
+        self.sums = dict.fromkeys(self.STAGES, 0.0)
+
+    def add(self, timings):
+        with self.lock:
+            self.count += 1
+            self.reused += timings['reused']
+            for stage in self.STAGES:
+                self.sums[stage] += timings[stage]
+
+def summarize_timings(totals):
+    """Average the session's request timings into a printable summary"""
+    if not totals.count:
+        return "no requests recorded"
+    avg = {stage: total / totals.count * 1000 for stage, total in totals.sums.items()}
+    return (f"{totals.count} requests, {totals.reused} on reused connections | avg dns {avg['dns']:.0f} ms, "
+            f"connect {avg['connect']:.0f} ms, ttfb {avg['ttfb']:.0f} ms, download {avg['download']:.0f} ms, "
+            f"total {avg['total']:.0f} ms")
+
+DEFAULT_CACHE_DIR = '.http_cache'
+DEFAULT_CACHE_TTL = 0  # seconds a cached page is served without revalidation
+DEFAULT_CACHE_MAX_MB = 500
+
+class OfflineCacheMiss(requests.RequestException):
+    """Raised in offline mode for a URL that is not in the cache"""
+
+class ResponseCache:
+    """On-disk response cache keyed by URL, with TTL and size-bounded LRU eviction.
+
+    Each entry is a `<sha1>.body` file plus a `<sha1>.json` metadata file
+    (url, ETag, Last-Modified, fetch time). The body file's mtime is bumped
+    on every hit and serves as the LRU clock.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttl=DEFAULT_CACHE_TTL,
+                 max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.hits = self.revalidated = self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(os.path.getsize(os.path.join(directory, name))
+                               for name in os.listdir(directory) if name.endswith('.body'))
+        if self.total_bytes > self.max_bytes:
+            self._evict()
+
+    def _paths(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.body', base + '.json'
+
+    def lookup(self, url):
+        """Cached (meta, body) for `url`, or None"""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+            os.utime(body_path)
+        except (OSError, ValueError):  # missing, or evicted by another worker meanwhile
+            return None
+        return meta, body
+
+    def count(self, outcome):
+        """Bump one of the hits/revalidated/misses counters"""
+        with self.lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def is_fresh(self, meta):
+        return time.time() - meta['fetched_at'] < self.ttl
+
+    def store(self, url, response):
+        """Save a 200 response body with its validators"""
+        body_path, meta_path = self._paths(url)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_type': response.headers.get('Content-Type'),
+            'fetched_at': time.time(),
+        }
+        with self.lock:
+            old_size = os.path.getsize(body_path) if os.path.exists(body_path) else 0
+            with open(body_path, 'wb') as f:
+                f.write(response.content)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            self.total_bytes += len(response.content) - old_size
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def touch(self, url, meta):
+        """Mark a revalidated (304) entry as freshly fetched"""
+        _, meta_path = self._paths(url)
+        meta['fetched_at'] = time.time()
+        with self.lock, open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits its budget"""
+        bodies = [os.path.join(self.directory, name)
+                  for name in os.listdir(self.directory) if name.endswith('.body')]
+        bodies.sort(key=os.path.getmtime)
+        for body_path in bodies:
+            if self.total_bytes <= self.max_bytes:
+                break
+            self.total_bytes -= os.path.getsize(body_path)
+            os.remove(body_path)
+            meta_path = body_path[:-len('.body')] + '.json'
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+
+    def stats(self):
+        return (f"{self.hits} served from cache, {self.revalidated} revalidated (304), "
+                f"{self.misses} downloaded, {self.total_bytes / 1024 / 1024:.1f} MB on disk")
+
+def cached_response(url, meta, body):
+    """Rebuild a requests.Response from a cache entry"""
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = body
+    response.encoding = None
+    if meta.get('content_type'):
+        response.headers['Content-Type'] = meta['content_type']
+    response.from_cache = True
+    return response
+
+class HttpClient:
+    """Shared session plus the per-crawl transport policy (timeouts, throttle, cache, metrics).
+
+    `throttle` needs wait(url); when it also has observe(url, response) and
+    observe_failure(url, error) it is told the outcome of every request.
+    429/503 responses are retried up to `retries` times, paced by the
+    throttle (or by Retry-After/exponential backoff without one).
+    """
+
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT, throttle=None, cache=None, metrics=None,
+                 retries=DEFAULT_RETRIES):
+        self.session = session or get_session()
+        self.timeout = timeout
+        self.throttle = throttle
+        self.cache = cache
+        self.metrics = metrics
+        self.retries = retries
+        self.adaptive = hasattr(throttle, 'observe')
+
+    def get(self, url):
+        """GET `url`, serving or revalidating from the cache when one is configured"""
+        cache = self.cache
+        entry = cache.lookup(url) if cache else None
+        if cache and entry and (cache.offline or cache.is_fresh(entry[0])):
+            cache.count('hits')
+            if self.metrics:
+                self.metrics.observe_cache_hit()
+            return cached_response(url, *entry)
+        if cache and cache.offline:
+            raise OfflineCacheMiss(f"offline and not cached: {url}")
+
+        headers = {}
+        if entry:
+            meta = entry[0]
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        response = self._fetch(url, headers)
+
+        if cache:
+            if response.status_code == 304 and entry:
+                cache.count('revalidated')
+                cache.touch(url, entry[0])
+                revalidated = cached_response(url, *entry)
+                revalidated.timings = response.timings
+                return revalidated
+            if response.status_code == 200:
+                cache.count('misses')
+                cache.store(url, response)
+        return response
+
+    def _fetch(self, url, headers):
+        """One network GET, retrying rate-limit responses through the throttle"""
+        for attempt in range(self.retries + 1):
+            if self.throttle:
+                self.throttle.wait(url)
+            try:
+                response = fetch(url, self.session, self.timeout, headers=headers)
+            except requests.RequestException as e:
+                if self.metrics:
+                    self.metrics.observe_failure(type(e).__name__)
+                if self.adaptive:
+                    self.throttle.observe_failure(url, e)
+                raise
+            if self.metrics:
+                self.metrics.observe_response(response.status_code, response.timings)
+            if self.adaptive:
+                self.throttle.observe(url, response)
+            if response.status_code not in RATE_LIMIT_STATUSES or attempt == self.retries:
+                return response
+            if not self.adaptive:
+                time.sleep(retry_after_seconds(response.headers.get('Retry-After'))
+                           or DEFAULT_BACKOFF * 2 ** attempt)
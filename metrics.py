@@ -0,0 +1,191 @@
+"""
+Live crawl instrumentation:
+- per-stage timings (dns/connect/ttfb/download per request, parse/extract
+  per detail page) as histograms
+- requests by HTTP status or failure kind, error rate (leaving out expected
+  errors such as the 404 that ends index discovery), pages per second
+- per-field fill rates of extracted records
+Snapshots are exported during the run as Prometheus text format (a file
+rewritten in place, e.g. for node_exporter's textfile collector) or as
+JSON lines appended to a log.
+"""
+
+import json
+import os
+import threading
+import time
+
+from parsers import RECORD_FIELDS
+
+METRIC_PREFIX = 'avtovitrin_crawl'
+STAGES = ('dns', 'connect', 'ttfb', 'download', 'parse', 'extract', 'index_parse')
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FILL_FIELDS = [field for field in RECORD_FIELDS if field != 'url']
+DEFAULT_INTERVAL = 10.0
+EXPORT_FORMATS = ('prometheus', 'jsonl')
+
+class Histogram:
+    """Cumulative-bucket timing histogram (Prometheus semantics)"""
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+class CrawlMetrics:
+    """Thread-safe counters and timings for one crawl, shared by fetches, parsing and the sinks"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.responses = {}  # HTTP status or failure kind -> count
+        self.expected = {}   # HTTP status -> error responses the crawl asked for on purpose
+        self.cache_hits = 0
+        self.records = self.failed_records = 0
+        self.filled = dict.fromkeys(FILL_FIELDS, 0)
+
+    def observe_response(self, status, timings=None):
+        """One HTTP response (status code) with its fetch() timings"""
+        with self.lock:
+            self.responses[str(status)] = self.responses.get(str(status), 0) + 1
+            for stage in ('dns', 'connect', 'ttfb', 'download'):
+                if timings and stage in timings:
+                    self.stages[stage].observe(timings[stage])
+
+    def observe_expected_error(self, status):
+        """Mark one observed error response as expected (the 404 probe past the last index
+        page): it stays in the response counts but not in the error rate"""
+        with self.lock:
+            self.expected[str(status)] = self.expected.get(str(status), 0) + 1
+
+    def observe_failure(self, kind):
+        """A request that got no response (timeout, connection error, ...)"""
+        with self.lock:
+            self.responses[kind] = self.responses.get(kind, 0) + 1
+
+    def observe_cache_hit(self):
+        with self.lock:
+            self.cache_hits += 1
+
+    def observe_stage(self, stage, seconds):
+        with self.lock:
+            self.stages[stage].observe(seconds)
+
+    def observe_record(self, record):
+        with self.lock:
+            self.records += 1
+            if record.get('error'):
+                self.failed_records += 1
+                return
+            for field in FILL_FIELDS:
+                if record.get(field):
+                    self.filled[field] += 1
+
+    def snapshot(self):
+        """Point-in-time view of every metric as plain data"""
+        with self.lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            requests = sum(self.responses.values())
+            errors = sum(count for status, count in self.responses.items()
+                         if not (status.isdigit() and int(status) < 400)) - sum(self.expected.values())
+            extracted = self.records - self.failed_records
+            return {
+                'time': time.time(),
+                'elapsed': elapsed,
+                'requests': requests,
+                'responses': dict(self.responses),
+                'expected_errors': dict(self.expected),
+                'cache_hits': self.cache_hits,
+                'pages_per_second': (requests + self.cache_hits) / elapsed,
+                'error_rate': errors / requests if requests else 0.0,
+                'records': self.records,
+                'failed_records': self.failed_records,
+                'fill_rate': {field: count / extracted if extracted else 0.0
+                              for field, count in self.filled.items()},
+                'stages': {stage: {'count': h.count, 'sum': h.sum, 'max': h.max, 'buckets': list(h.buckets)}
+                           for stage, h in self.stages.items()},
+            }
+
+def prometheus_text(snapshot):
+    """Render a snapshot in the Prometheus text exposition format"""
+    p = METRIC_PREFIX
+    lines = [f'# HELP {p}_responses_total Fetches by HTTP status or failure kind',
+             f'# TYPE {p}_responses_total counter']
+    lines += [f'{p}_responses_total{{status="{status}"}} {count}'
+              for status, count in sorted(snapshot['responses'].items())]
+    lines += [f'# HELP {p}_expected_errors_total Error responses asked for on purpose, not in the error rate',
+              f'# TYPE {p}_expected_errors_total counter']
+    lines += [f'{p}_expected_errors_total{{status="{status}"}} {count}'
+              for status, count in sorted(snapshot['expected_errors'].items())]
+    lines += [f'# TYPE {p}_cache_hits_total counter', f'{p}_cache_hits_total {snapshot["cache_hits"]}',
+              f'# TYPE {p}_records_total counter', f'{p}_records_total {snapshot["records"]}',
+              f'# TYPE {p}_failed_records_total counter', f'{p}_failed_records_total {snapshot["failed_records"]}',
+              f'# TYPE {p}_pages_per_second gauge', f'{p}_pages_per_second {snapshot["pages_per_second"]:.4f}',
+              f'# TYPE {p}_error_rate gauge', f'{p}_error_rate {snapshot["error_rate"]:.4f}',
+              f'# HELP {p}_field_fill_ratio Share of extracted records with the field filled',
+              f'# TYPE {p}_field_fill_ratio gauge']
+    lines += [f'{p}_field_fill_ratio{{field="{field}"}} {ratio:.4f}'
+              for field, ratio in snapshot['fill_rate'].items()]
+    lines += [f'# HELP {p}_stage_seconds Time per request/page in each crawl stage',
+              f'# TYPE {p}_stage_seconds histogram']
+    for stage, h in snapshot['stages'].items():
+        lines += [f'{p}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}'
+                  for bound, count in zip(BUCKETS, h['buckets'])]
+        lines += [f'{p}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {h["count"]}',
+                  f'{p}_stage_seconds_sum{{stage="{stage}"}} {h["sum"]:.6f}',
+                  f'{p}_stage_seconds_count{{stage="{stage}"}} {h["count"]}']
+    return '\n'.join(lines) + '\n'
+
+def json_line(snapshot):
+    """One compact JSON line per snapshot (stage histograms reduced to count/mean/max)"""
+    stages = {stage: {'count': h['count'], 'mean': h['sum'] / h['count'] if h['count'] else 0.0, 'max': h['max']}
+              for stage, h in snapshot['stages'].items()}
+    return json.dumps(dict(snapshot, stages=stages), ensure_ascii=False) + '\n'
+
+class MetricsExporter:
+    """Background thread writing CrawlMetrics snapshots every `interval` seconds (and once on stop)"""
+
+    def __init__(self, metrics, path, fmt='jsonl', interval=DEFAULT_INTERVAL):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown metrics format '{fmt}' (choose from {', '.join(EXPORT_FORMATS)})")
+        self.metrics = metrics
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='metrics', daemon=True)
+
+    def export(self):
+        snapshot = self.metrics.snapshot()
+        if self.fmt == 'prometheus':
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(prometheus_text(snapshot))
+            os.replace(tmp_path, self.path)  # scrapers never see a half-written file
+        else:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json_line(snapshot))
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.export()
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.export()
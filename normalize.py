@@ -0,0 +1,81 @@
+"""
+Typed normalization of scraped listing text, shared by the scraper's
+exports and generate_charts.py:
+- "13 600 AZN" / "74 181 km" / "1.7 L" / "150 a.g." -> float32 measures
+- "28-May-2025" -> datetime64, Bəli/Xeyir -> nullable booleans
+- repeated text dimensions -> categoricals
+Each column is parsed once per distinct value (via its categorical codes),
+so cost scales with the number of unique strings, not rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+# raw column -> (typed column, regex applied after removing whitespace)
+MEASURES = {
+    'price': ('price_numeric', r'(\d+)'),
+    'mileage': ('mileage_numeric', r'(\d+)'),
+    'engine_volume': ('engine_volume_numeric', r'(\d+\.?\d*)'),
+    'engine_power': ('engine_power_numeric', r'(\d+)'),
+    'views': ('views_numeric', r'(\d+)'),
+}
+
+FLAGS = {
+    'is_new': 'is_new_flag',
+    'credit_available': 'credit_flag',
+    'barter_possible': 'barter_flag',
+}
+YES_NO = {'Bəli': True, 'Xeyir': False}
+
+DIMENSIONS = ['brand', 'model', 'city', 'body_type', 'color', 'fuel_type', 'transmission',
+              'drivetrain', 'is_new', 'credit_available', 'barter_possible']
+
+UPDATED_FORMAT = '%d-%b-%Y'  # e.g. 28-May-2025
+
+def _by_unique(series, parse_unique, missing):
+    """Apply `parse_unique` to the distinct values only and broadcast back"""
+    codes, uniques = pd.factorize(series)
+    parsed = np.append(parse_unique(pd.Series(uniques, dtype='object')), missing)
+    return parsed[codes]  # code -1 (missing input) picks the trailing `missing` slot
+
+def parse_measure(series, pattern):
+    """Numeric value out of text like '74 181 km' as float32 (NaN if absent)"""
+    def parse(uniques):
+        digits = uniques.astype(str).str.replace(r'\s', '', regex=True).str.extract(pattern, expand=False)
+        return pd.to_numeric(digits, errors='coerce').to_numpy(dtype='float32')
+    return pd.Series(_by_unique(series, parse, np.float32('nan')), index=series.index)
+
+def parse_updated(series):
+    """'28-May-2025' -> datetime64 (NaT if unreadable)"""
+    def parse(uniques):
+        return pd.to_datetime(uniques, format=UPDATED_FORMAT, errors='coerce').to_numpy(dtype='datetime64[ns]')
+    return pd.Series(_by_unique(series, parse, np.datetime64('NaT', 'ns')), index=series.index)
+
+def parse_flag(series):
+    """Bəli/Xeyir -> nullable boolean"""
+    return series.map(YES_NO).astype('boolean')
+
+def normalize_listings(df, categorical=True):
+    """Return a copy of `df` with typed columns added in one pass.
+
+    Raw text columns are kept (charts label with them); measures gain a
+    float32 `<name>_numeric` twin, `year` a nullable Int16 `year_numeric`,
+    `updated` a datetime `updated_date`, the yes/no fields boolean `*_flag`
+    columns, and text dimensions become categoricals.
+    """
+    df = df.copy()
+    for raw, (typed, pattern) in MEASURES.items():
+        if raw in df:
+            df[typed] = parse_measure(df[raw], pattern)
+    if 'year' in df:
+        df['year_numeric'] = pd.to_numeric(df['year'], errors='coerce').astype('Int16')
+    if 'updated' in df:
+        df['updated_date'] = parse_updated(df['updated'])
+    for raw, typed in FLAGS.items():
+        if raw in df:
+            df[typed] = parse_flag(df[raw])
+    if categorical:
+        for column in DIMENSIONS:
+            if column in df:
+                df[column] = df[column].astype('category')
+    return df
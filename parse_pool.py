@@ -0,0 +1,154 @@
+"""
+Detail-page parsing in worker processes, off the fetch threads:
+- HTML parsing and field extraction hold the GIL, so with many fetch
+  threads they serialize; a process pool scales them with cores while the
+  threads only do network I/O
+- fetch threads hand over raw response bytes (pickled as a plain copy, no
+  parse trees cross the process boundary) and get records back
+- pages travel in batches to amortize IPC; a partial batch is sent after
+  `max_wait` seconds so records keep streaming on a slow crawl
+"""
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+from functools import partial
+
+from failures import parse_error_text
+from parsers import DEFAULT_BACKEND, parse_car_page
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_MAX_WAIT = 0.25  # seconds a partial batch may wait for more pages
+# Spawned, not forked: forking a process full of threads can copy held locks
+START_METHOD = 'spawn'
+MAX_RESTARTS = 3  # fresh pools started after a worker dies before giving up on parsing
+
+def failed_record(url, error):
+    return {'phone': '', 'owner': '', 'url': url, 'error': error}
+
+def parse_batch(pages, backend=DEFAULT_BACKEND):
+    """Worker side: [(url, content)] -> [(url, record, timings)]"""
+    results = []
+    for url, content in pages:
+        timings = {}
+        try:
+            record = parse_car_page(content, url, backend, timings)
+        except Exception as e:
+            record = failed_record(url, parse_error_text(e))
+        results.append((url, record, timings))
+    return results
+
+class ParsePool:
+    """Batches fetched pages into a process pool; `on_record(url, record, timings, content)` receives each result.
+
+    on_record runs on the pool's result thread. At most two batches per
+    worker are in flight, so submit() blocks (back-pressure on the fetch
+    threads) when parsing falls behind. A worker that dies turns the
+    batches in flight into error records; later batches go to a fresh
+    pool, up to MAX_RESTARTS times, then become error records too.
+    """
+
+    def __init__(self, workers, on_record, backend=DEFAULT_BACKEND, batch_size=DEFAULT_BATCH_SIZE,
+                 max_wait=DEFAULT_MAX_WAIT):
+        self.workers = workers
+        self.executor = self._start()
+        self.restarts = 0
+        self.restart_lock = threading.Lock()
+        self.on_record = on_record
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.lock = threading.Lock()
+        self.batch = []
+        self.batch_started = 0.0
+        self.in_flight = threading.BoundedSemaphore(2 * workers)
+        self.outstanding = 0  # batches taken whose records have not all been delivered yet
+        self.delivered = threading.Condition()
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(target=self._run, name='parse-flush', daemon=True)
+        self.flusher.start()
+
+    def submit(self, url, content):
+        with self.lock:
+            if not self.batch:
+                self.batch_started = time.monotonic()
+            self.batch.append((url, content))
+            batch = self._take() if len(self.batch) >= self.batch_size else None
+        if batch:
+            self._send(batch)
+
+    def _take(self):
+        """Hand over the pending batch (call with self.lock held)"""
+        batch, self.batch = self.batch, []
+        if batch:
+            # Counted before the lock is released, so drain() cannot miss a batch on its way to _send
+            with self.delivered:
+                self.outstanding += 1
+        return batch
+
+    def _start(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD))
+
+    def _submit(self, batch):
+        executor = self.executor
+        try:
+            return executor.submit(parse_batch, batch, self.backend)
+        except BrokenExecutor:
+            # A dead worker breaks the whole pool for good: replace it
+            with self.restart_lock:
+                if self.executor is executor:
+                    if self.restarts >= MAX_RESTARTS:
+                        raise
+                    self.restarts += 1
+                    print(f"Parse worker died, restarting the parse pool ({self.restarts} of {MAX_RESTARTS})")
+                    executor.shutdown(wait=False)
+                    self.executor = self._start()
+            return self.executor.submit(parse_batch, batch, self.backend)
+
+    def _send(self, batch):
+        self.in_flight.acquire()
+        try:
+            future = self._submit(batch)
+        except Exception as e:  # pool restarts used up, or the batch did not pickle
+            future = Future()
+            future.set_exception(e)
+        # Runs _done at once for a future that already failed
+        future.add_done_callback(partial(self._done, batch))
+
+    def _done(self, batch, future):
+        self.in_flight.release()
+        try:
+            try:
+                results = future.result()
+            except Exception as e:  # a worker died (BrokenProcessPool) or the batch could not be sent
+                results = [(url, failed_record(url, f"parse worker failed: {e!r}"), {}) for url, _ in batch]
+            for (url, record, timings), (_, content) in zip(results, batch):
+                self.on_record(url, record, timings, content)
+        finally:
+            with self.delivered:
+                self.outstanding -= 1
+                self.delivered.notify_all()
+
+    def _run(self):
+        while not self.stopped.wait(self.max_wait / 2):
+            with self.lock:
+                due = self.batch and time.monotonic() - self.batch_started >= self.max_wait
+                batch = self._take() if due else None
+            if batch:
+                self._send(batch)
+
+    def drain(self):
+        """Parse what is still queued and wait until every record has been delivered"""
+        with self.lock:
+            batch = self._take()
+        if batch:
+            self._send(batch)
+        with self.delivered:
+            self.delivered.wait_for(lambda: self.outstanding == 0)
+
+    def close(self):
+        self.stopped.set()
+        self.flusher.join()
+        self.drain()
+        self.executor.shutdown(wait=True)
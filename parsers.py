@@ -0,0 +1,435 @@
+"""
+HTML parser backends for listing (index) and detail pages:
+- html.parser / lxml: BeautifulSoup tree builders
+- selectolax: lexbor-based CSS extractor (no soup objects at all)
+Every backend feeds the same row index, so records are identical across backends.
+"""
+
+import re
+import time
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401 - only needed as a BeautifulSoup tree builder
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# Column order of an output record - phone/owner first as requested
+RECORD_FIELDS = [
+    'phone', 'owner', 'url', 'brand', 'model', 'price', 'city', 'year',
+    'body_type', 'color', 'engine_volume', 'engine_power', 'fuel_type',
+    'mileage', 'transmission', 'drivetrain', 'is_new', 'credit_available',
+    'barter_possible', 'views', 'updated', 'listing_id'
+]
+
+# Field mapping for car data - using EXACT text matching
+FIELD_MAPPING = {
+    'Şəhər': 'city',
+    'Marka': 'brand',
+    'Model': 'model',
+    'Buraxılış ili': 'year',
+    'Ban növü': 'body_type',
+    'Rəng': 'color',
+    'Mühərrikin həcmi': 'engine_volume',
+    'Mühərrikin gücü': 'engine_power',
+    'Yanacaq növü': 'fuel_type',
+    'Yürüş': 'mileage',
+    'Sürətlər qutusu': 'transmission',
+    'Ötürücü': 'drivetrain',
+    'Yeni': 'is_new',
+    'Kredit': 'credit_available',
+    'Barter mümkündür': 'barter_possible'
+}
+
+# Fields read from the contact table (owner/phone block)
+CONTACT_FIELDS = {
+    'Baxışların sayı': 'views',
+    'Yeniləndi': 'updated',
+    'nömrəsi': 'listing_id'
+}
+
+# Partial record harvested from a new-ads.php card
+CARD_FIELDS = ['url', 'listing_id', 'title', 'price', 'year', 'mileage', 'thumbnail']
+
+# Pager links on new-ads.php index pages
+PAGE_LINK_RE = re.compile(r'[?&]page=(\d+)')
+LISTING_ID_RE = re.compile(r'/cars/(\d+)')
+YEAR_RE = re.compile(r'\b(19[5-9]\d|20\d\d)\b')
+MILEAGE_RE = re.compile(r'\d[\d\s]*km\b', re.IGNORECASE)
+
+# Text shapes shared by the extraction spec and the card heuristics
+PHONE_PATTERN = r'\A(?=.*\()(?=.*\))(?=.*\d)'                   # parenthesised area code and a digit
+PHONE_SCAN_PATTERN = r'\A(?=.*\()(?=.*\))(?=(?:\D*\d){7})'      # same, with at least 7 digits
+PRICE_TEXT_PATTERN = r'\A(?=.*AZN)\s*\S+(?:\s+\S+){0,2}\s*\Z'  # concise AZN text, at most 3 words
+PRICE_TEXT_RE = re.compile(PRICE_TEXT_PATTERN, re.DOTALL)
+
+# Declarative extraction spec for detail pages, compiled once at import
+# (CELL_RULES / FIELD_RULES below) and reused for every page; another
+# layout of the same label-row/cell shape is supported by editing these
+# tables, not the extractor.
+#
+# CELL_SPEC classifies td cells while a page is indexed. Each group is
+# (contact table only, [(kind, selector), ...]): a td takes the first kind
+# of each group it matches, and the first td of every kind is kept.
+# Selectors: '.name' has class name, '*name' has a class containing name
+# (any case), '~regex' the td's single text node matches.
+CELL_SPEC = [
+    (False, [('price_car1', '.price_car1'), ('price_car', '.price_car'), ('price_any', '*price')]),
+    (True, [('phone_class', '.row_phone_number'), ('phone_text', '~' + PHONE_PATTERN)]),
+    (True, [('owner', '.rowone')]),
+]
+
+# FIELD_SPEC resolves record fields. Sources are tried in fallback order:
+# 'spec:Label' (label row anywhere on the page), 'contact:Label' (label
+# row of the contact table), 'cell:kind' (a CELL_SPEC cell) and
+# 'scan:regex' (first text node matching, within the contact table for
+# contact fields). A candidate must match `accept` and not `reject`;
+# `extract` keeps its first group (or whole match). Contact fields stay
+# empty on pages without a contact table.
+FIELD_SPEC = (
+    [{'field': key, 'sources': ['spec:' + label]} for label, key in FIELD_MAPPING.items()]
+    + [{'field': 'price', 'sources': ['cell:price_car1', 'cell:price_car', 'cell:price_any',
+                                      'scan:' + PRICE_TEXT_PATTERN], 'accept': 'AZN'},
+       {'field': 'owner', 'contact': True, 'sources': ['cell:owner'], 'reject': 'AZN|.{50}'},
+       {'field': 'phone', 'contact': True, 'sources': ['cell:phone_class', 'cell:phone_text',
+                                                       'scan:' + PHONE_SCAN_PATTERN], 'accept': PHONE_PATTERN}]
+    + [{'field': key, 'contact': True, 'sources': ['contact:' + label]} for label, key in CONTACT_FIELDS.items()]
+)
+
+def listing_id_from_url(url):
+    """Listing number from a detail URL slug (/cars/0008207-khazar-sd -> 0008207)"""
+    match = LISTING_ID_RE.search(url)
+    return match.group(1) if match else ''
+
+def canonical_url(url):
+    """One spelling per page: no surrounding whitespace, fragment or trailing slash; lower-case scheme and host"""
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/') or '/', parts.query, ''))
+
+def listing_key(url):
+    """Identity of a listing across URL variants: the id in its slug, else its canonical URL"""
+    return listing_id_from_url(url) or canonical_url(url)
+
+def lookup(index, field_name):
+    """Value for `field_name`: exact label match first, then substring"""
+    for label in (field_name, field_name + ':'):
+        if label in index:
+            return index[label]
+    for label, value in index.items():
+        if field_name in label:
+            return value
+    return None
+
+def compile_selector(selector):
+    """CELL_SPEC selector -> predicate(classes, single_string)"""
+    kind, arg = selector[0], selector[1:]
+    if kind == '.':
+        return lambda classes, string: arg in classes
+    if kind == '*':
+        return lambda classes, string: any(arg in c.lower() for c in classes)
+    if kind == '~':
+        pattern = re.compile(arg, re.DOTALL)
+        return lambda classes, string: bool(string) and pattern.search(string) is not None
+    raise ValueError(f"Unknown cell selector '{selector}'")
+
+def compile_cells(spec):
+    return [(contact_only, [(kind, compile_selector(selector)) for kind, selector in kinds])
+            for contact_only, kinds in spec]
+
+class FieldRule:
+    """One compiled FIELD_SPEC entry"""
+
+    def __init__(self, field, sources, contact=False, accept=None, reject=None, extract=None):
+        self.field = field
+        self.contact = contact
+        self.sources = [self._compile_source(source) for source in sources]
+        self.accept = re.compile(accept, re.DOTALL) if accept else None
+        self.reject = re.compile(reject, re.DOTALL) if reject else None
+        self.extract = re.compile(extract, re.DOTALL) if extract else None
+
+    def _compile_source(self, source):
+        kind, _, arg = source.partition(':')
+        if kind in ('spec', 'contact', 'cell'):
+            return kind, arg
+        if kind == 'scan':
+            return kind, re.compile(arg, re.DOTALL)
+        raise ValueError(f"Unknown source '{source}' for field '{self.field}'")
+
+    def resolve(self, page):
+        """First acceptable value over the sources, or ''"""
+        for kind, arg in self.sources:
+            if kind == 'cell':
+                value = page.cells.get(arg)
+            elif kind == 'scan':
+                value = page.scan(arg, self.contact)
+            else:
+                value = lookup(page.spec if kind == 'spec' else page.contact, arg)
+                if value == arg:  # a label cell read back as the value: the row has none
+                    continue
+            if not value:
+                continue
+            if (self.accept and not self.accept.search(value)) or (self.reject and self.reject.search(value)):
+                continue
+            if self.extract:
+                match = self.extract.search(value)
+                if not match:
+                    continue
+                value = match.group(1) if match.groups() else match.group(0)
+            return value
+        return ''
+
+CELL_RULES = compile_cells(CELL_SPEC)
+FIELD_RULES = [FieldRule(**rule) for rule in FIELD_SPEC]
+
+class PageIndex:
+    """Everything the extractor needs from a detail page, gathered in one row walk.
+
+    `spec` / `contact` map row labels to value text (document order, first
+    occurrence wins) for the whole page and the contact table; `cells` holds
+    the text of the first td of each CELL_SPEC kind. Backends fill these
+    and implement the rarely-needed text-scan fallback.
+    """
+
+    def __init__(self):
+        self.spec = {}
+        self.contact = {}
+        self.cells = {}
+        self.has_contact = False
+
+    def add_cell(self, classes, in_contact, single_string, text):
+        """Classify one td with CELL_RULES; `text` is called only when kept"""
+        for contact_only, kinds in CELL_RULES:
+            if contact_only and not in_contact:
+                continue
+            for kind, matches in kinds:
+                if matches(classes, single_string):
+                    if kind not in self.cells:
+                        self.cells[kind] = text()
+                    break
+
+    def add_label(self, label, in_contact, value, link_value):
+        """Record a label -> value pair (link text preferred for spec rows)"""
+        if label not in self.spec:
+            self.spec[label] = link_value()
+        if in_contact and label not in self.contact:
+            self.contact[label] = value()
+
+    def scan(self, pattern, contact=False):
+        """First text node (stripped) matching `pattern`, in the contact table or the whole page"""
+        raise NotImplementedError
+
+class SoupPageIndex(PageIndex):
+    """Row index over a BeautifulSoup tree (html.parser or lxml builder)"""
+
+    def __init__(self, content, features):
+        super().__init__()
+        self.soup = BeautifulSoup(content, features)
+        self.contact_table = self.soup.find('table', class_='table1')
+        self.has_contact = self.contact_table is not None
+        contact_rows = set(map(id, self.contact_table.find_all('tr'))) if self.contact_table else set()
+
+        for row in self.soup.find_all('tr'):
+            in_contact = id(row) in contact_rows
+            tds = row.find_all('td')
+            for idx, td in enumerate(tds):
+                self.add_cell(td.get('class') or [], in_contact, td.string,
+                              lambda td=td: td.get_text(strip=True))
+                if idx + 1 < len(tds):
+                    label = td.get_text(strip=True)
+                    if label:
+                        value_td = tds[idx + 1]
+                        self.add_label(label, in_contact,
+                                       lambda: value_td.get_text(strip=True),
+                                       lambda: self._link_or_text(value_td))
+
+    @staticmethod
+    def _link_or_text(td):
+        link = td.find('a')
+        return link.get_text(strip=True) if link else td.get_text(strip=True)
+
+    def scan(self, pattern, contact=False):
+        root = self.contact_table if contact else self.soup
+        elem = next(iter(root.find_all(string=pattern)), None) if root is not None else None
+        return elem.strip() if elem else ''
+
+class SelectolaxPageIndex(PageIndex):
+    """Row index built with lexbor CSS selectors (selectolax)"""
+
+    def __init__(self, content):
+        super().__init__()
+        self.tree = LexborHTMLParser(content)
+        self.contact_table = self.tree.css_first('table.table1')
+        self.has_contact = self.contact_table is not None
+        contact_rows = {row.mem_id for row in self.contact_table.css('tr')} if self.contact_table else set()
+
+        for row in self.tree.css('tr'):
+            in_contact = row.mem_id in contact_rows
+            tds = row.css('td')
+            for idx, td in enumerate(tds):
+                classes = (td.attributes.get('class') or '').split()
+                self.add_cell(classes, in_contact, self._single_string(td),
+                              lambda td=td: td.text(strip=True))
+                if idx + 1 < len(tds):
+                    label = td.text(strip=True)
+                    if label:
+                        value_td = tds[idx + 1]
+                        self.add_label(label, in_contact,
+                                       lambda: value_td.text(strip=True),
+                                       lambda: self._link_or_text(value_td))
+
+    @staticmethod
+    def _link_or_text(td):
+        link = td.css_first('a')
+        return link.text(strip=True) if link else td.text(strip=True)
+
+    @staticmethod
+    def _single_string(node):
+        """Equivalent of BeautifulSoup's Tag.string"""
+        while node is not None:
+            children = list(node.iter(include_text=True))
+            if len(children) != 1:
+                return None
+            node = children[0]
+            if node.tag == '-text':
+                return node.text_content
+        return None
+
+    @staticmethod
+    def _text_nodes(root):
+        for node in root.traverse(include_text=True):
+            if node.tag == '-text':
+                yield node.text_content
+
+    def scan(self, pattern, contact=False):
+        root = self.contact_table if contact else self.tree.root
+        text = next((text for text in self._text_nodes(root) if pattern.search(text)), None) if root else None
+        return text.strip() if text else ''
+
+def record_from_index(page, url, rules=FIELD_RULES):
+    """Resolve one listing record from a PageIndex with compiled FIELD_SPEC rules"""
+    # Initialize with phone/owner first as requested
+    data = dict.fromkeys(RECORD_FIELDS, '')
+    data['url'] = url
+    for rule in rules:
+        if page.has_contact or not rule.contact:
+            data[rule.field] = rule.resolve(page)
+    return data
+
+def last_page_number(hrefs):
+    """Highest ?page=N among pager links, or None when there is no pager"""
+    pages = [int(match.group(1)) for match in map(PAGE_LINK_RE.search, hrefs) if match]
+    return max(pages) if pages else None
+
+def card_record(url, texts, title='', thumbnail=''):
+    """Partial record from one index card: its link, text nodes and image.
+
+    Cards carry no labels, so fields are recognised by shape: the first
+    AZN text is the price, a 'km' text the mileage, a plausible year the
+    year, and the link title / image alt (else the first other text) the
+    title. Fields the card does not show stay empty; the URL is
+    canonicalized.
+    """
+    card = dict.fromkeys(CARD_FIELDS, '')
+    url = canonical_url(url)
+    card.update(url=url, listing_id=listing_id_from_url(url), thumbnail=thumbnail)
+    other = []
+    for text in texts:
+        if not card['price'] and PRICE_TEXT_RE.search(text):
+            card['price'] = text
+        elif not card['mileage'] and MILEAGE_RE.fullmatch(text):
+            card['mileage'] = text
+        else:
+            other.append(text)
+    for text in other:
+        match = YEAR_RE.search(text)
+        if match:
+            card['year'] = match.group(1)
+            break
+    card['title'] = title or next((text for text in other if not YEAR_RE.fullmatch(text)), '')
+    return card
+
+def soup_index_cards(content, base_url, features):
+    soup = BeautifulSoup(content, features)
+    cards = []
+    for item in soup.find_all('div', class_='cars__item'):
+        link = item.find('a', href=True)
+        if link and 'cars/' in link['href']:
+            img = item.find('img')
+            src = img and (img.get('data-src') or img.get('src'))
+            texts = [text.strip() for text in item.find_all(string=True) if text.strip()]
+            cards.append(card_record(urljoin(base_url, link['href']), texts,
+                                     link.get('title') or (img.get('alt') if img else '') or '',
+                                     urljoin(base_url, src) if src else ''))
+    pager = [link['href'] for link in soup.find_all('a', href=PAGE_LINK_RE)]
+    return cards, last_page_number(pager)
+
+def selectolax_index_cards(content, base_url):
+    tree = LexborHTMLParser(content)
+    cards = []
+    for item in tree.css('div.cars__item'):
+        link = item.css_first('a[href]')
+        if link and 'cars/' in link.attributes['href']:
+            img = item.css_first('img')
+            src = img and (img.attributes.get('data-src') or img.attributes.get('src'))
+            texts = [text.strip() for text in SelectolaxPageIndex._text_nodes(item) if text.strip()]
+            cards.append(card_record(urljoin(base_url, link.attributes['href']), texts,
+                                     link.attributes.get('title') or (img.attributes.get('alt') if img else '') or '',
+                                     urljoin(base_url, src) if src else ''))
+    pager = [link.attributes['href'] for link in tree.css('a[href*="page="]')]
+    return cards, last_page_number(pager)
+
+# name -> (detail page indexer, index page card extractor)
+BACKENDS = {
+    'html.parser': (lambda content: SoupPageIndex(content, 'html.parser'),
+                    lambda content, base_url: soup_index_cards(content, base_url, 'html.parser')),
+}
+if HAS_LXML:
+    BACKENDS['lxml'] = (lambda content: SoupPageIndex(content, 'lxml'),
+                        lambda content, base_url: soup_index_cards(content, base_url, 'lxml'))
+if LexborHTMLParser is not None:
+    BACKENDS['selectolax'] = (SelectolaxPageIndex, selectolax_index_cards)
+
+DEFAULT_BACKEND = 'html.parser'
+ALL_BACKENDS = ('html.parser', 'lxml', 'selectolax')
+
+def get_backend(name):
+    """Look up an installed backend, with a helpful error for missing ones"""
+    if name not in BACKENDS:
+        if name in ALL_BACKENDS:
+            raise ValueError(f"Parser backend '{name}' is not installed (pip install {name})")
+        raise ValueError(f"Unknown parser backend '{name}' (choose from {', '.join(ALL_BACKENDS)})")
+    return BACKENDS[name]
+
+def parse_car_page(content, url, backend=DEFAULT_BACKEND, timings=None):
+    """Extract one listing record from a detail page's HTML.
+
+    If `timings` is a dict, seconds spent parsing the HTML into the row
+    index ('parse') and resolving the record from it ('extract') are stored.
+    """
+    indexer, _ = get_backend(backend)
+    if timings is None:
+        return record_from_index(indexer(content), url)
+    start = time.perf_counter()
+    page = indexer(content)
+    parsed = time.perf_counter()
+    record = record_from_index(page, url)
+    timings['parse'], timings['extract'] = parsed - start, time.perf_counter() - parsed
+    return record
+
+def parse_index_cards(content, base_url, backend=DEFAULT_BACKEND):
+    """Parse a new-ads index page.
+
+    Returns (cards, last_page): a partial record (CARD_FIELDS) for every
+    `cars__item` card, and the highest page number linked from the pager
+    (None if the page has no pager).
+    """
+    _, extract_cards = get_backend(backend)
+    return extract_cards(content, base_url)
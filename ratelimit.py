@@ -0,0 +1,148 @@
+"""
+Adaptive per-host rate limiting shared by every fetch:
+- token bucket: requests start at most `rate` per second per host, with a
+  small burst allowance
+- AIMD: the rate grows additively while responses are fast and healthy and
+  is cut multiplicatively on 429/503, timeouts and connection errors, or
+  when first-byte latency climbs well above the best seen
+- Retry-After on 429/503 pauses the host for the advertised time
+Every rate change is printed so the limits can be tuned.
+"""
+
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+DEFAULT_RPS = 2.0
+DEFAULT_MIN_RPS = 0.2
+DEFAULT_MAX_RPS = 10.0
+DEFAULT_BURST = 2.0          # tokens a host can bank while idle
+ADDITIVE_INCREASE = 1.0      # req/s gained per second of healthy responses
+MULTIPLICATIVE_DECREASE = 0.5
+LATENCY_FACTOR = 3.0         # "slow" = smoothed TTFB above this multiple of the best seen
+LATENCY_SMOOTHING = 0.2      # EWMA weight of the newest TTFB sample
+DECREASE_COOLDOWN = 1.0      # seconds; one burst of errors cuts the rate once
+LOG_STEP = 1.25              # log increases each time the rate grows by this factor
+RATE_LIMIT_STATUSES = (429, 503)
+
+def retry_after_seconds(value, now=None):
+    """Seconds from a Retry-After header (delta-seconds or HTTP-date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - (now or datetime.now(timezone.utc))).total_seconds(), 0.0)
+
+class HostState:
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.tokens = burst
+        self.updated = now
+        self.blocked_until = 0.0
+        self.last_decrease = float('-inf')
+        self.logged_rate = rate
+        self.latency = None
+        self.best_latency = None
+        self.increases = self.decreases = self.pauses = 0
+
+class AdaptiveRateLimiter:
+    """Token bucket per host whose rate follows server feedback (AIMD).
+
+    `wait(url)` blocks until the host has a token (or its Retry-After pause
+    is over); `observe(url, response)` feeds back each response's status,
+    Retry-After header and first-byte time, `observe_failure(url, error)`
+    requests that got no response. Thread-safe; one instance is shared by
+    every fetch of a crawl. `clock` and `sleep` default to time.monotonic
+    and time.sleep; tests pass a fake clock.
+    """
+
+    def __init__(self, rps=DEFAULT_RPS, min_rps=DEFAULT_MIN_RPS, max_rps=DEFAULT_MAX_RPS,
+                 burst=DEFAULT_BURST, log=print, clock=time.monotonic, sleep=time.sleep):
+        self.initial = min(max(rps, min_rps), max_rps)
+        self.min_rps = min_rps
+        self.max_rps = max_rps
+        self.burst = burst
+        self.log = log
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.hosts = {}
+
+    def _state(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = HostState(self.initial, self.burst, self.clock())
+        return self.hosts[host]
+
+    def wait(self, url):
+        """Block until the host of `url` has budget for one more request"""
+        host = urlparse(url).netloc
+        with self.lock:
+            state = self._state(host)
+            now = self.clock()
+            state.tokens = min(self.burst, state.tokens + (now - state.updated) * state.rate)
+            state.updated = now
+            state.tokens -= 1  # negative balance = reserved slot in the future
+            delay = max(-state.tokens / state.rate, state.blocked_until - now, 0.0)
+        if delay > 0:
+            self.sleep(delay)
+
+    def observe(self, url, response):
+        """Adjust the host's rate from one response"""
+        host = urlparse(url).netloc
+        status = response.status_code
+        ttfb = getattr(response, 'timings', {}).get('ttfb')
+        with self.lock:
+            state = self._state(host)
+            now = self.clock()
+            if status in RATE_LIMIT_STATUSES:
+                pause = retry_after_seconds(response.headers.get('Retry-After'))
+                if pause:
+                    state.blocked_until = max(state.blocked_until, now + pause)
+                    state.pauses += 1
+                    self.log(f"[rate] {host}: HTTP {status}, pausing {pause:.1f}s (Retry-After)")
+                self._decrease(host, state, now, f"HTTP {status}")
+                return
+            if ttfb is not None:
+                state.latency = ttfb if state.latency is None else (
+                    LATENCY_SMOOTHING * ttfb + (1 - LATENCY_SMOOTHING) * state.latency)
+                state.best_latency = min(state.best_latency or state.latency, state.latency)
+                if state.latency > LATENCY_FACTOR * state.best_latency:
+                    self._decrease(host, state, now, f"ttfb {state.latency * 1000:.0f} ms "
+                                                     f"(best {state.best_latency * 1000:.0f} ms)")
+                    return
+            if status < 400 and state.rate < self.max_rps:
+                state.rate = min(self.max_rps, state.rate + ADDITIVE_INCREASE / state.rate)
+                state.increases += 1
+                if state.rate >= state.logged_rate * LOG_STEP or state.rate == self.max_rps:
+                    self.log(f"[rate] {host}: healthy, up to {state.rate:.2f} req/s")
+                    state.logged_rate = state.rate
+
+    def observe_failure(self, url, error):
+        """A request that got no response (timeout, reset, ...) counts as overload"""
+        host = urlparse(url).netloc
+        with self.lock:
+            self._decrease(host, self._state(host), self.clock(), type(error).__name__)
+
+    def _decrease(self, host, state, now, reason):
+        if now - state.last_decrease < DECREASE_COOLDOWN:
+            return
+        old = state.rate
+        state.rate = max(self.min_rps, state.rate * MULTIPLICATIVE_DECREASE)
+        state.last_decrease = now
+        state.logged_rate = state.rate
+        state.decreases += 1
+        self.log(f"[rate] {host}: {reason}, down from {old:.2f} to {state.rate:.2f} req/s")
+
+    def summary(self):
+        with self.lock:
+            return "; ".join(f"{host} at {s.rate:.2f} req/s ({s.increases} increases, {s.decreases} decreases, "
+                             f"{s.pauses} Retry-After pauses)" for host, s in self.hosts.items()) or "no requests"
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Local replay of avtovitrin.com from saved HTML fixtures, for offline benchmarks:
+- /new-ads.php?page=N -> <fixtures>/index/new-ads-N.html
+- /cars/<slug>        -> <fixtures>/cars/<slug>
+- anything else (or a missing fixture) -> 404
+Pages carry an ETag (content hash) and Last-Modified (file mtime) and
+conditional requests that match get a bodiless 304, like the real site.
+Every response can be delayed (fixed latency plus uniform jitter) and a
+share of them (optionally only paths under `error_prefix`, e.g. /cars/)
+replaced by injected errors (503, or 429 with Retry-After).
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+INDEX_DIR = 'index'
+DETAIL_DIR = 'cars'
+DEFAULT_ERROR_STATUSES = (503,)
+RETRY_AFTER = 1  # seconds advertised on injected 429s
+
+def fixture_path(fixtures, request_path):
+    """Fixture file for a request path, or None if it maps to nothing"""
+    parts = urlsplit(request_path)
+    if parts.path == '/new-ads.php':
+        page = parse_qs(parts.query).get('page', ['1'])[0]
+        return os.path.join(fixtures, INDEX_DIR, f"new-ads-{page}.html") if page.isdigit() else None
+    if parts.path.startswith('/cars/'):
+        slug = parts.path[len('/cars/'):]
+        return os.path.join(fixtures, DETAIL_DIR, slug) if slug and '/' not in slug and slug[0] != '.' else None
+    return None
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real site
+
+    def do_GET(self):
+        server = self.server
+        server.count('requests')
+        delay = server.latency + server.rng.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+
+        if (server.error_rate and self.path.startswith(server.error_prefix)
+                and server.rng.random() < server.error_rate):
+            status = server.rng.choice(server.error_statuses)
+            server.count('errors')
+            self.reply(status, b'injected error', {'Retry-After': str(RETRY_AFTER)} if status == 429 else {})
+            return
+
+        path = fixture_path(server.fixtures, self.path)
+        if not path or not os.path.isfile(path):
+            self.reply(404, b'not found')
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        modified = int(os.path.getmtime(path))
+        validators = {'ETag': f'"{hashlib.sha1(body).hexdigest()}"',
+                      'Last-Modified': formatdate(modified, usegmt=True)}
+        if self.not_modified(validators['ETag'], modified):
+            server.count('not_modified')
+            self.reply(304, b'', validators)
+            return
+        self.reply(200, body, validators)
+
+    def not_modified(self, etag, modified):
+        """Whether the request's validators still match the page (If-None-Match wins over If-Modified-Since)"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match:
+            return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match.strip() == '*'
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if not if_modified_since:
+            return False
+        try:
+            return modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class ReplayServer(ThreadingHTTPServer):
+    """Threaded fixture server; use as a context manager to run it in a background thread"""
+
+    daemon_threads = True
+
+    def __init__(self, fixtures, port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_statuses=DEFAULT_ERROR_STATUSES, seed=0, error_prefix='/'):
+        super().__init__(('127.0.0.1', port), ReplayHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.error_prefix = error_prefix
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'errors': 0, 'not_modified': 0}
+        self.thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='replay-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        self.thread.join()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve saved avtovitrin.com fixtures locally")
+    parser.add_argument('fixtures', help=f"fixture directory with {INDEX_DIR}/ and {DETAIL_DIR}/")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra uniform random delay, up to N seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of responses replaced by errors")
+    parser.add_argument('--error-statuses', type=int, nargs='+', default=list(DEFAULT_ERROR_STATUSES))
+    parser.add_argument('--error-prefix', default='/',
+                        help="only inject errors into paths starting with this, e.g. /cars/ (default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = ReplayServer(args.fixtures, args.port, args.latency, args.jitter, args.error_rate,
+                          args.error_statuses, args.seed, args.error_prefix)
+    print(f"Replaying {args.fixtures} on {server.url}/new-ads.php (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Listing storage across crawl runs:
+- SQLite table keyed by listing_id, upserted record by record, with
+  first_seen/last_seen timestamps so history survives between runs
+- Change detection by per-record content hash: unchanged listings only
+  bump last_seen, changes are logged as field deltas, and price moves
+  go to a price-history table
+- Columnar Parquet export with typed columns for fast analytics loads
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from normalize import normalize_listings
+from parsers import RECORD_FIELDS, listing_id_from_url
+
+DEFAULT_DB = 'car_listings.sqlite'
+DEFAULT_PARQUET = 'car_listings.parquet'
+DEFAULT_BATCH_SIZE = 50
+
+DATA_COLUMNS = [field for field in RECORD_FIELDS if field != 'listing_id']
+# Columns the content hash and change log cover: the URL is left out, since the
+# same listing reached through another host, port or scheme has not changed
+COMPARED_COLUMNS = [column for column in DATA_COLUMNS if column != 'url']
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS listings (
+    listing_id TEXT PRIMARY KEY,
+    {', '.join(f'{column} TEXT' for column in DATA_COLUMNS)},
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    content_hash TEXT,
+    removed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_listings_last_seen ON listings(last_seen);
+CREATE INDEX IF NOT EXISTS idx_listings_brand_model ON listings(brand, model);
+CREATE TABLE IF NOT EXISTS listing_changes (
+    listing_id TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    change TEXT NOT NULL,
+    fields TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_changes_observed_at ON listing_changes(observed_at);
+CREATE TABLE IF NOT EXISTS price_history (
+    listing_id TEXT NOT NULL,
+    observed_at TEXT NOT NULL,
+    price TEXT,
+    PRIMARY KEY (listing_id, observed_at)
+);
+"""
+
+# Columns added after the first release, for stores created before them
+MIGRATIONS = {'content_hash': 'TEXT', 'removed_at': 'TEXT'}
+
+UPSERT = f"""
+INSERT INTO listings (listing_id, {', '.join(DATA_COLUMNS)}, content_hash, first_seen, last_seen)
+VALUES (?, {', '.join('?' for _ in DATA_COLUMNS)}, ?, ?, ?)
+ON CONFLICT(listing_id) DO UPDATE SET
+    {', '.join(f'{column} = excluded.{column}' for column in DATA_COLUMNS)},
+    content_hash = excluded.content_hash,
+    last_seen = excluded.last_seen,
+    removed_at = NULL
+"""
+
+TOUCH = "UPDATE listings SET last_seen = ? WHERE listing_id = ?"
+TOUCH_LISTED = TOUCH + " AND removed_at IS NULL"
+LOG_CHANGE = "INSERT INTO listing_changes (listing_id, observed_at, change, fields) VALUES (?, ?, ?, ?)"
+LOG_PRICE = "INSERT OR REPLACE INTO price_history (listing_id, observed_at, price) VALUES (?, ?, ?)"
+
+# Detail fetch errors that mean the listing is gone rather than unreachable
+GONE_ERRORS = ('HTTP 404', 'HTTP 410')
+
+def utc_now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def content_hash(values):
+    """Stable hash of a record's COMPARED_COLUMNS values (given in DATA_COLUMNS order)"""
+    compared = (value for column, value in zip(DATA_COLUMNS, values) if column in COMPARED_COLUMNS)
+    return hashlib.sha1('\x1f'.join(compared).encode('utf-8')).hexdigest()
+
+class ListingStore:
+    """SQLite listing table with batched, change-detecting upserts on listing_id.
+
+    first_seen/last_seen are crawl start times, so every listing seen in the
+    latest crawl shares the same last_seen. Each batch is compared with the
+    stored rows by content hash: unchanged listings only bump last_seen, new
+    and changed ones are written and logged to listing_changes (changed
+    fields as {field: [old, new]}), and price moves are appended to
+    price_history. Failed extractions are never upserted, so an error row
+    cannot wipe a listing stored by an earlier run. Use from a single thread.
+    """
+
+    def __init__(self, path=DEFAULT_DB, batch_size=DEFAULT_BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = []
+        self.seen = set()
+        self.gone = set()
+        self.changes = dict.fromkeys(('new', 'changed', 'unchanged', 'relisted', 'removed'), 0)
+        self.crawl_time = utc_now()
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+
+    def _migrate(self):
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(listings)')}
+        if columns:
+            for column, kind in MIGRATIONS.items():
+                if column not in columns:
+                    self.conn.execute(f'ALTER TABLE listings ADD COLUMN {column} {kind}')
+
+    def upsert(self, record):
+        """Queue one record; written in batches of `batch_size`"""
+        listing_id = record.get('listing_id') or listing_id_from_url(record.get('url', ''))
+        if not listing_id:
+            return
+        if record.get('error'):
+            # Still listed unless the detail page itself is gone
+            (self.gone if record['error'] in GONE_ERRORS else self.seen).add(listing_id)
+            return
+        self.seen.add(listing_id)
+        self.pending.append((listing_id, [record.get(column, '') or '' for column in DATA_COLUMNS]))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    # Lets the store sit next to the CSV writer as a pipeline sink
+    write = upsert
+
+    def _stored(self, listing_ids):
+        """Stored (content_hash, removed_at, values) of the given listings"""
+        placeholders = ', '.join('?' for _ in listing_ids)
+        rows = self.conn.execute(f"SELECT listing_id, content_hash, removed_at, {', '.join(DATA_COLUMNS)} "
+                                 f"FROM listings WHERE listing_id IN ({placeholders})", list(listing_ids))
+        return {row[0]: (row[1], row[2], ['' if value is None else value for value in row[3:]]) for row in rows}
+
+    def flush(self):
+        if not self.pending:
+            return
+        stored = self._stored({listing_id for listing_id, _ in self.pending})
+        upserts, touches, changes, prices = [], [], [], []
+        price_index = DATA_COLUMNS.index('price')
+        for listing_id, values in self.pending:
+            digest = content_hash(values)
+            old_hash, removed_at, old_values = stored.get(listing_id, (None, None, None))
+            if old_values is not None and old_hash == digest and removed_at is None:
+                self.changes['unchanged'] += 1
+                touches.append((self.crawl_time, listing_id))
+                continue
+
+            if old_values is None:
+                change, fields = 'new', None
+            else:
+                diff = {column: [old, new] for column, old, new in zip(DATA_COLUMNS, old_values, values)
+                        if old != new and column in COMPARED_COLUMNS}
+                change = 'relisted' if removed_at else 'changed' if diff else None
+                fields = json.dumps(diff, ensure_ascii=False) if diff else None
+            if change:
+                self.changes[change] += 1
+                changes.append((listing_id, self.crawl_time, change, fields))
+            else:
+                self.changes['unchanged'] += 1  # stored without a hash, or hashed with the URL
+            if old_values is None or old_values[price_index] != values[price_index]:
+                prices.append((listing_id, self.crawl_time, values[price_index]))
+            upserts.append([listing_id] + values + [digest, self.crawl_time, self.crawl_time])
+            stored[listing_id] = (digest, None, values)
+
+        with self.conn:
+            self.conn.executemany(UPSERT, upserts)
+            self.conn.executemany(TOUCH, touches)
+            self.conn.executemany(LOG_CHANGE, changes)
+            self.conn.executemany(LOG_PRICE, prices)
+        self.pending = []
+
+    def mark_listed(self, listing_ids):
+        """Listings seen on index pages but deliberately not fetched this run: not removed, and
+        stored ones still listed get this crawl's last_seen; returns how many were bumped"""
+        listing_ids = list(listing_ids)
+        self.seen.update(listing_ids)
+        with self.conn:
+            cursor = self.conn.executemany(TOUCH_LISTED, [(self.crawl_time, listing_id) for listing_id in listing_ids])
+        return cursor.rowcount
+
+    def mark_removed(self):
+        """Log stored listings missing from this (complete) crawl as removed; returns how many"""
+        self.flush()
+        candidates = self.conn.execute('SELECT listing_id FROM listings WHERE removed_at IS NULL '
+                                       'AND last_seen < ?', (self.crawl_time,))
+        removed = [listing_id for (listing_id,) in candidates
+                   if listing_id not in self.seen or listing_id in self.gone]
+        with self.conn:
+            self.conn.executemany('UPDATE listings SET removed_at = ? WHERE listing_id = ?',
+                                  [(self.crawl_time, listing_id) for listing_id in removed])
+            self.conn.executemany(LOG_CHANGE, [(listing_id, self.crawl_time, 'removed', None)
+                                               for listing_id in removed])
+        self.changes['removed'] += len(removed)
+        return len(removed)
+
+    def summary(self):
+        return ", ".join(f"{count} {change}" for change, count in self.changes.items())
+
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM listings').fetchone()[0]
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_listings(db_path=DEFAULT_DB, latest_only=False):
+    """Stored listings as a DataFrame; `latest_only` keeps those seen in the latest crawl"""
+    query = 'SELECT * FROM listings'
+    if latest_only:
+        query += ' WHERE last_seen = (SELECT MAX(last_seen) FROM listings)'
+    with sqlite3.connect(db_path) as conn:
+        return pd.read_sql_query(query, conn)
+
+def load_changes(db_path=DEFAULT_DB, since=None):
+    """Logged listing changes (new/changed/relisted/removed), optionally only those observed at or after `since`"""
+    query, params = 'SELECT * FROM listing_changes', ()
+    if since:
+        query, params = query + ' WHERE observed_at >= ?', (since,)
+    with sqlite3.connect(db_path) as conn:
+        df = pd.read_sql_query(query + ' ORDER BY observed_at, listing_id', conn, params=params)
+    df['fields'] = df['fields'].map(lambda fields: json.loads(fields) if fields else {})
+    return df
+
+def load_price_history(db_path=DEFAULT_DB):
+    """Every observed price per listing, oldest first, with a parsed price_numeric"""
+    with sqlite3.connect(db_path) as conn:
+        df = pd.read_sql_query('SELECT * FROM price_history ORDER BY listing_id, observed_at', conn)
+    return normalize_listings(df, categorical=False)
+
+def typed_frame(df):
+    """Compact typed columns for the columnar export"""
+    df = normalize_listings(df)
+    for column in ('first_seen', 'last_seen', 'removed_at'):
+        df[column] = pd.to_datetime(df[column], utc=True, errors='coerce')
+    return df
+
+def export_parquet(db_path=DEFAULT_DB, parquet_path=DEFAULT_PARQUET):
+    """Write the listing table to Parquet; returns the row count, or None without pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("pyarrow is not installed, skipping Parquet export (pip install pyarrow)")
+        return None
+    df = typed_frame(load_listings(db_path))
+    tmp_path = parquet_path + '.tmp'
+    df.to_parquet(tmp_path, engine='pyarrow', index=False)
+    os.replace(tmp_path, parquet_path)
+    return len(df)
@@ -0,0 +1,18 @@
+import os
+import sys
+
+# The scraper modules live at the repository root, not in a package
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES = os.path.join(ROOT, 'tests', 'fixtures', 'site')
+
+def listings_frame(rows):
+    """Raw listings shaped like the scraper's CSV, with every column the chart cube reads"""
+    from benchmark import synthetic_listings
+
+    df = synthetic_listings(rows)
+    df['year'] = [str(1995 + n % 30) for n in range(rows)]
+    for n, column in enumerate(('body_type', 'transmission', 'fuel_type', 'drivetrain', 'color')):
+        df[column] = [f"{column}-{(row * (n + 2)) % 5}" for row in range(rows)]
+    return df
@@ -0,0 +1,69 @@
+"""Aggregate cube: the chunked build matches the one-shot build, and the cache key covers the code"""
+
+import pandas as pd
+import pytest
+
+import aggregates
+from aggregates import (DIMENSIONS, build_cube, build_cube_chunked, dataset_fingerprint,
+                        finalize_cube, load_or_build_cube, merge_partials, partial_cube)
+from conftest import listings_frame
+from generate_charts import CUBE_CODE, clean_listings, iter_dataset, load_dataset
+
+ROWS = 1000
+
+@pytest.fixture(scope='module')
+def listings_csv(tmp_path_factory):
+    df = listings_frame(ROWS)
+    df.loc[::97, 'model'] = None  # dropped by the cleaning
+    path = tmp_path_factory.mktemp('data') / 'listings.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+def assert_cubes_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    assert actual['total'] == expected['total']
+    for name in expected:
+        if name != 'total':
+            pd.testing.assert_frame_equal(actual[name], expected[name], check_exact=False, check_index_type=False)
+
+@pytest.mark.parametrize('chunk_size', [37, 250, ROWS])
+def test_chunked_cube_equals_one_shot(listings_csv, chunk_size):
+    expected = build_cube(load_dataset(listings_csv))
+    assert 0 < expected['total'] < ROWS
+    assert set(expected) == {'total', 'year', 'mileage_bin', 'views_bin', 'price_bin', *DIMENSIONS}
+    assert_cubes_equal(build_cube_chunked(iter_dataset(listings_csv, chunk_size)), expected)
+
+def test_merge_partials_is_order_independent(listings_csv):
+    df_clean = clean_listings(pd.read_csv(listings_csv))
+    parts = [partial_cube(df_clean.iloc[start:start + 300]) for start in range(0, len(df_clean), 300)]
+    assert len(parts) == 4
+    forward = merge_partials(merge_partials(parts[0], parts[1]), merge_partials(parts[2], parts[3]))
+    backward = merge_partials(parts[3], merge_partials(parts[2], merge_partials(parts[1], parts[0])))
+    assert_cubes_equal(finalize_cube(forward), build_cube(df_clean))
+    assert_cubes_equal(finalize_cube(backward), build_cube(df_clean))
+
+def test_cache_key_covers_cleaning_and_aggregation_code(listings_csv, tmp_path, monkeypatch):
+    def clean_v1(df):
+        return df
+
+    def clean_v2(df):
+        return df.dropna()
+
+    assert dataset_fingerprint(listings_csv, CUBE_CODE) == dataset_fingerprint(listings_csv, CUBE_CODE)
+    assert dataset_fingerprint(listings_csv, [clean_v1]) != dataset_fingerprint(listings_csv, [clean_v2])
+
+    builds = []
+    def build(path):
+        builds.append(path)
+        return {'total': len(builds)}
+
+    cache_dir = str(tmp_path / 'cache')
+    assert load_or_build_cube(listings_csv, build, cache_dir, [clean_v1]) == ({'total': 1}, False)
+    assert load_or_build_cube(listings_csv, build, cache_dir, [clean_v1]) == ({'total': 1}, True)
+    assert load_or_build_cube(listings_csv, build, cache_dir, [clean_v2]) == ({'total': 2}, False)
+
+    # An edit to aggregates.py itself changes the key too
+    source = aggregates.inspect.getsource
+    monkeypatch.setattr(aggregates.inspect, 'getsource',
+                        lambda obj: source(obj) + '# edited' if obj is aggregates else source(obj))
+    assert load_or_build_cube(listings_csv, build, cache_dir, [clean_v1]) == ({'total': 3}, False)
@@ -0,0 +1,174 @@
+"""End-to-end crawls of the committed fixture sites through an in-process replay server"""
+
+import os
+import shutil
+
+import pytest
+
+from benchmark import run_crawl, synthetic_listings
+from conftest import FIXTURES, ROOT
+from failures import DeadLetterStore
+from final_complete_scraper import CrawlStats, SeenIndex, crawl, parse_args
+from http_session import HttpClient, create_session
+from metrics import CrawlMetrics
+from parsers import parse_car_page
+from replay_server import DETAIL_DIR, ReplayServer
+
+SYNTHETIC = os.path.join(ROOT, 'tests', 'fixtures', 'synthetic')
+SYNTHETIC_LISTINGS = 15  # benchmark.py synthesize --pages 3 --per-page 5 --filler 1
+
+class RecordSink:
+    def __init__(self):
+        self.records = []
+
+    def write(self, record):
+        self.records.append(record)
+
+    def close(self):
+        pass
+
+def crawl_site(base_url, *argv, previous=None, skip=None, dead_letters=None):
+    """Records written by one unthrottled crawl, with retries only at the crawl tail"""
+    args = parse_args(['--base-url', base_url, '--rps', '0', '--retry-backoff', '0', *argv])
+    client = HttpClient(create_session(pool_size=args.workers, retries=0), metrics=CrawlMetrics(), retries=0)
+    sink, stats, discovery = RecordSink(), CrawlStats(), {}
+    crawl(args, client, [sink], stats, previous, discovery=discovery, skip=skip, dead_letters=dead_letters)
+    return sorted(sink.records, key=lambda record: record['url']), stats, discovery
+
+def expected_records(fixtures, base_url, missing=()):
+    """What parsing every detail fixture directly gives, in URL order"""
+    records = []
+    for slug in sorted(os.listdir(os.path.join(fixtures, DETAIL_DIR))):
+        if slug not in missing:
+            with open(os.path.join(fixtures, DETAIL_DIR, slug), 'rb') as f:
+                records.append(parse_car_page(f.read(), f"{base_url}/cars/{slug}"))
+    return sorted(records, key=lambda record: record['url'])
+
+@pytest.fixture(scope='module')
+def synthetic_server():
+    with ReplayServer(SYNTHETIC) as server:
+        yield server
+
+def test_synthetic_pages_parse_to_their_source_values():
+    listings = synthetic_listings(SYNTHETIC_LISTINGS)
+    records = expected_records(SYNTHETIC, 'http://127.0.0.1')
+    assert len(records) == SYNTHETIC_LISTINGS
+    for n, record in enumerate(records):
+        assert record['listing_id'] == f"{n + 1:07d}"
+        for field in ('brand', 'model', 'city', 'price', 'mileage', 'engine_volume', 'views', 'updated'):
+            assert record[field] == listings.loc[n, field]
+
+def test_crawl_site_fixtures():
+    with ReplayServer(FIXTURES) as server:
+        records, stats, discovery = crawl_site(server.url)
+    # Index page 2 repeats one listing under a URL variant: fetched once
+    assert records == expected_records(FIXTURES, server.url)
+    assert [record['listing_id'] for record in records] == ['0000101', '0000102', '0000103', '']
+    assert discovery['complete']
+    assert stats.processed == stats.successful == 4
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_crawl_synthetic(synthetic_server, workers):
+    records, stats, discovery = crawl_site(synthetic_server.url, '--workers', str(workers))
+    assert records == expected_records(SYNTHETIC, synthetic_server.url)
+    assert discovery['complete'] and not discovery['skipped']
+    assert stats.successful == SYNTHETIC_LISTINGS
+
+def test_crawl_with_parse_pool(synthetic_server):
+    records, stats, _ = crawl_site(synthetic_server.url, '--parse-workers', '1', '--parse-batch', '4')
+    assert records == expected_records(SYNTHETIC, synthetic_server.url)
+
+def test_incremental_refresh_fetches_only_repriced_listings(tmp_path):
+    fixtures = tmp_path / 'site'
+    shutil.copytree(SYNTHETIC, fixtures)
+    with ReplayServer(str(fixtures)) as server:
+        records, _, _ = crawl_site(server.url)
+        previous = {record['listing_id']: record for record in records}
+
+        served = server.counters['requests']
+        refreshed, stats, _ = crawl_site(server.url, '--incremental', previous=previous)
+        assert server.counters['requests'] - served == 4  # 3 index pages + probe, no detail page
+        assert refreshed == records and stats.reused == SYNTHETIC_LISTINGS
+
+        for page in (fixtures / 'index' / 'new-ads-1.html', fixtures / DETAIL_DIR / '0000002-opel'):
+            page.write_bytes(page.read_bytes().replace(b'70800 AZN', b'68500 AZN'))
+        served = server.counters['requests']
+        refreshed, stats, _ = crawl_site(server.url, '--incremental', previous=previous)
+        assert server.counters['requests'] - served == 4 + 1
+        assert stats.reused == SYNTHETIC_LISTINGS - 1
+        assert [record['price'] for record in refreshed if record['listing_id'] == '0000002'] == ['68500 AZN']
+
+def card(href, title):
+    return f'<div class="cars__item"><a href="{href}"><img alt="{title}"></a></div>'.encode()
+
+def test_url_variants_are_fetched_once_and_new_only_skips_seen_listings(tmp_path):
+    fixtures = tmp_path / 'site'
+    shutil.copytree(SYNTHETIC, fixtures)
+    last_index = fixtures / 'index' / 'new-ads-3.html'
+    variants = (card('/cars/0000001-mercedes-benz', 'Mercedes')  # same id, another slug
+                + card('/cars/0000002-opel ', 'Opel')             # trailing space
+                + card('/cars/0000003-mercedes/', 'Mercedes'))    # trailing slash
+    last_index.write_bytes(last_index.read_bytes().replace(b'<div class="pager">', variants + b'<div class="pager">'))
+    seen = SeenIndex(str(tmp_path / 'seen_listings')).open()
+
+    with ReplayServer(str(fixtures)) as server:
+        records, _, _ = crawl_site(server.url)
+        assert records == expected_records(str(fixtures), server.url)
+        for record in records:
+            seen.write(record)
+        seen.close()
+        assert len(seen) == SYNTHETIC_LISTINGS
+
+        served = server.counters['requests']
+        records, _, discovery = crawl_site(server.url, '--new-only', skip=SeenIndex(seen.path).load().keys)
+        assert records == [] and len(discovery['skipped']) == SYNTHETIC_LISTINGS
+        assert server.counters['requests'] - served == 4  # index pages and probe only
+
+        shutil.copy(fixtures / DETAIL_DIR / '0000002-opel', fixtures / DETAIL_DIR / '0000016-opel')
+        last_index.write_bytes(last_index.read_bytes().replace(
+            b'<div class="pager">', card('/cars/0000016-opel', 'Opel') + b'<div class="pager">'))
+        served = server.counters['requests']
+        records, _, _ = crawl_site(server.url, '--new-only', skip=SeenIndex(seen.path).load().keys)
+        assert [record['url'] for record in records] == [f"{server.url}/cars/0000016-opel"]
+        assert server.counters['requests'] - served == 4 + 1
+
+def test_transient_errors_are_retried_at_the_tail():
+    with ReplayServer(SYNTHETIC, error_rate=0.5, error_prefix='/cars/', seed=1) as server:
+        records, stats, _ = crawl_site(server.url, '--max-attempts', '30')
+        injected = server.counters['errors']
+    assert injected > 0
+    assert records == expected_records(SYNTHETIC, server.url)
+    assert stats.successful == SYNTHETIC_LISTINGS
+
+def test_missing_page_is_dead_lettered_and_skipped_next_run(tmp_path):
+    fixtures = tmp_path / 'site'
+    shutil.copytree(SYNTHETIC, fixtures)
+    os.remove(fixtures / DETAIL_DIR / '0000003-mercedes')
+    dead_letters = DeadLetterStore(str(tmp_path / 'dead_letters'))
+
+    with ReplayServer(str(fixtures)) as server:
+        records, stats, _ = crawl_site(server.url, dead_letters=dead_letters)
+        failed = [record for record in records if record.get('error')]
+        assert [(record['url'], record['error']) for record in failed] == [(f"{server.url}/cars/0000003-mercedes",
+                                                                            'HTTP 404')]
+        assert [record for record in records if not record.get('error')] == expected_records(
+            str(fixtures), server.url, missing=['0000003-mercedes'])
+
+        entry = DeadLetterStore(dead_letters.directory).load().entries['0000003']
+        assert (entry['kind'], entry['reason'], entry['attempts']) == ('permanent', 'HTTP 404', 1)
+        assert (tmp_path / 'dead_letters' / entry['page']).read_bytes() == b'not found'
+
+        served = server.counters['requests']
+        records, _, discovery = crawl_site(server.url, skip=dead_letters.hopeless())
+        assert discovery['skipped'] == ['0000003']
+        assert len(records) == SYNTHETIC_LISTINGS - 1 and not any(record.get('error') for record in records)
+        assert server.counters['requests'] - served == 4 + SYNTHETIC_LISTINGS - 1  # 3 index pages + probe
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_benchmark_crawl(synthetic_server, workers):
+    seconds, stats, snapshot = run_crawl(synthetic_server.url, workers)
+    assert stats.processed == stats.successful == SYNTHETIC_LISTINGS
+    assert seconds > 0 and snapshot['pages_per_second'] > 0
+    assert snapshot['requests'] == 4 + SYNTHETIC_LISTINGS  # 3 index pages and the 404 probe past the last
+    assert snapshot['responses'] == {'200': 3 + SYNTHETIC_LISTINGS, '404': 1}
+    assert snapshot['expected_errors'] == {'404': 1} and snapshot['error_rate'] == 0.0
@@ -0,0 +1,52 @@
+"""Incremental chart rendering: unchanged charts are skipped, a changed data slice re-renders only its chart"""
+
+import os
+
+import pytest
+
+import generate_charts
+from conftest import listings_frame
+
+CHARTS = ['2', '3', '4']  # body type, transmission, fuel type
+FILES = ['02_body_type_distribution.png', '03_price_by_transmission.png', '04_fuel_type_analysis.png']
+
+@pytest.fixture
+def run_charts(tmp_path, monkeypatch, capsys):
+    csv_path = tmp_path / 'listings.csv'
+    monkeypatch.setattr(generate_charts, 'DATA_CSV', str(csv_path))
+    monkeypatch.setattr(generate_charts, 'DATA_PARQUET', str(tmp_path / 'missing.parquet'))
+    output_dir, cache_dir = tmp_path / 'charts', tmp_path / 'cache'
+
+    def run(df):
+        df.to_csv(csv_path, index=False)
+        capsys.readouterr()
+        generate_charts.main(['--charts', *CHARTS, '--workers', '1',
+                              '--output-dir', str(output_dir), '--cache-dir', str(cache_dir)])
+        out = capsys.readouterr().out
+        rendered = sorted(filename for filename in FILES if f"{filename} " in out.split('Render times:')[1])
+        return rendered, out
+
+    run.output_dir = output_dir
+    return run
+
+def test_only_charts_with_changed_data_rerender(run_charts):
+    df = listings_frame(300)
+    rendered, out = run_charts(df)
+    assert rendered == FILES
+    assert all(os.path.exists(run_charts.output_dir / filename) for filename in FILES)
+    assert f"Output directory: {run_charts.output_dir}\n" in out
+    mtimes = {filename: os.path.getmtime(run_charts.output_dir / filename) for filename in FILES}
+
+    rendered, out = run_charts(df)
+    assert rendered == []
+    assert "Using cached aggregates" in out and "Charts generated: 0 (3 up to date)" in out
+
+    df.loc[0, 'body_type'] = 'Hatchback'  # only the body_type slice of the cube changes
+    rendered, out = run_charts(df)
+    assert "Using cached aggregates" not in out
+    assert rendered == ['02_body_type_distribution.png']
+    assert all(os.path.getmtime(run_charts.output_dir / filename) == mtimes[filename] for filename in FILES[1:])
+
+    os.remove(run_charts.output_dir / FILES[2])
+    rendered, _ = run_charts(df)
+    assert rendered == [FILES[2]]
@@ -0,0 +1,57 @@
+"""Response cache: conditional revalidation against the replay server, and entries evicted mid-lookup"""
+
+import os
+import shutil
+
+import requests
+
+import http_session
+from conftest import FIXTURES
+from http_session import HttpClient, ResponseCache, create_session
+from replay_server import DETAIL_DIR, ReplayServer
+
+SLUG = '0000101-toyota-camry'
+
+def test_conditional_revalidation(tmp_path):
+    page = tmp_path / DETAIL_DIR / SLUG
+    os.makedirs(page.parent)
+    shutil.copy(os.path.join(FIXTURES, DETAIL_DIR, SLUG), page)
+    cache = ResponseCache(str(tmp_path / 'cache'), ttl=0)
+
+    with ReplayServer(str(tmp_path)) as server:
+        client = HttpClient(create_session(retries=0), cache=cache, retries=0)
+        url = f"{server.url}/cars/{SLUG}"
+        first = client.get(url)
+        meta, body = cache.lookup(url)
+        assert first.status_code == 200 and body == page.read_bytes()
+        assert meta['etag'] and meta['last_modified']
+
+        second = client.get(url)  # stale at ttl 0: If-None-Match -> 304, body from the cache
+        assert second.status_code == 200 and second.content == body and second.from_cache
+        assert (cache.misses, cache.revalidated, server.counters['not_modified']) == (1, 1, 1)
+
+        page.write_bytes(body.replace(b'27 500 AZN', b'26 900 AZN'))
+        os.utime(page, (meta['fetched_at'] + 60,) * 2)
+        third = client.get(url)  # ETag no longer matches: full 200 replaces the entry
+        assert b'26 900 AZN' in third.content and cache.lookup(url)[1] == third.content
+        assert (cache.misses, cache.revalidated, server.counters['not_modified']) == (2, 1, 1)
+
+        last_modified = third.headers['Last-Modified']
+        assert requests.get(url, headers={'If-Modified-Since': last_modified}).status_code == 304
+        assert requests.get(url, headers={'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'}).status_code == 200
+        assert requests.get(url, headers={'If-None-Match': '"other"',
+                                          'If-Modified-Since': last_modified}).status_code == 200
+
+def test_lookup_of_an_entry_evicted_meanwhile_is_a_miss(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / 'cache'))
+    response = requests.Response()
+    response.status_code, response._content = 200, b'<html></html>'
+    cache.store('http://example.test/cars/1', response)
+    assert cache.lookup('http://example.test/cars/1')[1] == b'<html></html>'
+
+    def evicted(path, *args):
+        os.remove(path)  # another worker's _evict() ran between the read and the LRU bump
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(http_session.os, 'utime', evicted)
+    assert cache.lookup('http://example.test/cars/1') is None
@@ -0,0 +1,57 @@
+"""CrawlJournal checkpoints survive a crash mid-line"""
+
+import json
+
+import pytest
+
+from final_complete_scraper import CrawlJournal
+
+def record(url):
+    return {'phone': '', 'owner': '', 'url': url, 'brand': 'Kia'}
+
+def write_lines(path, text):
+    path.write_text(text, encoding='utf-8')
+
+def entry(url):
+    return json.dumps({'url': url, 'record': record(url)}) + '\n'
+
+@pytest.mark.parametrize('tail', ['', '{"url": "b", "rec', '{"url": "b", "record": {"phone": "(050)'])
+def test_resume_after_torn_line(tmp_path, tail):
+    path = tmp_path / 'journal.jsonl'
+    write_lines(path, entry('a') + tail)
+
+    journal = CrawlJournal(str(path), sync_every=1)
+    assert list(journal.load()) == ['a']
+    journal.open(resume=True)
+    journal.append('c', record('c'))
+    journal.close()
+
+    assert CrawlJournal(str(path)).load() == {'a': record('a'), 'c': record('c')}
+    assert path.read_text(encoding='utf-8') == entry('a') + entry('c')
+
+def test_resume_after_torn_first_line(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    write_lines(path, '{"url": "a", "re')
+    journal = CrawlJournal(str(path), sync_every=1)
+    journal.open(resume=True)
+    journal.append('b', record('b'))
+    journal.close()
+    assert list(CrawlJournal(str(path)).load()) == ['b']
+
+def test_torn_line_longer_than_a_read_chunk(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    write_lines(path, entry('a') + '{"url": "b", "record": "' + 'x' * 10000)
+    journal = CrawlJournal(str(path))
+    journal._truncate_torn_line(chunk_size=64)
+    assert path.read_text(encoding='utf-8') == entry('a')
+
+def test_fresh_run_starts_empty(tmp_path):
+    path = tmp_path / 'journal.jsonl'
+    write_lines(path, entry('a'))
+    journal = CrawlJournal(str(path))
+    journal.open(resume=False)
+    journal.append('b', record('b'))
+    journal.close(completed=False)
+    assert list(CrawlJournal(str(path)).load()) == ['b']
+    journal.close(completed=True)
+    assert not path.exists()
@@ -0,0 +1,24 @@
+"""Crawl metrics: error rate and its exports"""
+
+import json
+
+from metrics import CrawlMetrics, json_line, prometheus_text
+
+def test_expected_errors_are_left_out_of_the_error_rate():
+    metrics = CrawlMetrics()
+    for status in (200, 200, 404, 404, 503):
+        metrics.observe_response(status)
+    metrics.observe_failure('ConnectTimeout')
+    metrics.observe_expected_error(404)  # the probe past the last index page
+
+    snapshot = metrics.snapshot()
+    assert snapshot['requests'] == 6
+    assert snapshot['responses'] == {'200': 2, '404': 2, '503': 1, 'ConnectTimeout': 1}
+    assert snapshot['expected_errors'] == {'404': 1}
+    assert snapshot['error_rate'] == 3 / 6  # the other 404, the 503 and the timeout
+
+    text = prometheus_text(snapshot)
+    assert 'avtovitrin_crawl_responses_total{status="404"} 2' in text
+    assert 'avtovitrin_crawl_expected_errors_total{status="404"} 1' in text
+    assert 'avtovitrin_crawl_error_rate 0.5000' in text
+    assert json.loads(json_line(snapshot))['expected_errors'] == {'404': 1}
@@ -0,0 +1,50 @@
+"""ParsePool delivery guarantees"""
+
+import os
+import time
+
+from conftest import FIXTURES
+from parse_pool import ParsePool
+from parsers import parse_car_page
+from replay_server import DETAIL_DIR
+
+def detail_pages():
+    directory = os.path.join(FIXTURES, DETAIL_DIR)
+    pages = []
+    for slug in sorted(os.listdir(directory)):
+        with open(os.path.join(directory, slug), 'rb') as f:
+            pages.append((f"https://www.avtovitrin.com/cars/{slug}", f.read()))
+    return pages
+
+class SlowSendPool(ParsePool):
+    """Widens the gap between the flusher taking a batch and sending it"""
+
+    def _send(self, batch):
+        time.sleep(0.5)
+        super()._send(batch)
+
+def test_drain_waits_for_a_batch_the_flusher_is_sending():
+    delivered = {}
+    pool = SlowSendPool(1, lambda url, record, timings, content: delivered.setdefault(url, record),
+                        batch_size=100, max_wait=0.05)
+    try:
+        pages = detail_pages()
+        for url, content in pages:
+            pool.submit(url, content)
+        deadline = time.monotonic() + 5
+        while pool.batch and time.monotonic() < deadline:  # until the flusher has taken the partial batch
+            time.sleep(0.01)
+        assert not pool.batch
+        pool.drain()
+        assert delivered == {url: parse_car_page(content, url) for url, content in pages}
+    finally:
+        pool.close()
+
+def test_close_delivers_every_record():
+    delivered = []
+    pool = ParsePool(1, lambda url, record, timings, content: delivered.append((url, content)), batch_size=3)
+    pages = detail_pages()
+    for url, content in pages:
+        pool.submit(url, content)
+    pool.close()
+    assert sorted(delivered) == sorted(pages)
@@ -0,0 +1,68 @@
+"""Every installed parser backend must extract exactly what the html.parser reference does"""
+
+import os
+
+import pytest
+
+from conftest import FIXTURES
+from parsers import BACKENDS, DEFAULT_BACKEND, parse_car_page, parse_index_cards
+from replay_server import DETAIL_DIR, INDEX_DIR
+
+BASE_URL = 'https://www.avtovitrin.com'
+OTHER_BACKENDS = [backend for backend in BACKENDS if backend != DEFAULT_BACKEND]
+
+def fixture_pages(kind):
+    directory = os.path.join(FIXTURES, kind)
+    return sorted(os.listdir(directory))
+
+def read_fixture(kind, name):
+    with open(os.path.join(FIXTURES, kind, name), 'rb') as f:
+        return f.read()
+
+@pytest.mark.parametrize('backend', OTHER_BACKENDS)
+@pytest.mark.parametrize('slug', fixture_pages(DETAIL_DIR))
+def test_detail_page_conformance(slug, backend):
+    content, url = read_fixture(DETAIL_DIR, slug), f"{BASE_URL}/cars/{slug}"
+    assert parse_car_page(content, url, backend) == parse_car_page(content, url, DEFAULT_BACKEND)
+
+@pytest.mark.parametrize('backend', OTHER_BACKENDS)
+@pytest.mark.parametrize('name', fixture_pages(INDEX_DIR))
+def test_index_page_conformance(name, backend):
+    content = read_fixture(INDEX_DIR, name)
+    assert parse_index_cards(content, BASE_URL, backend) == parse_index_cards(content, BASE_URL, DEFAULT_BACKEND)
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_detail_page_fields(backend):
+    record = parse_car_page(read_fixture(DETAIL_DIR, '0000101-toyota-camry'),
+                            f"{BASE_URL}/cars/0000101-toyota-camry", backend)
+    assert record['phone'] == '(050)000-01-01'
+    assert record['owner'] == 'Elvin'
+    assert (record['brand'], record['model'], record['year']) == ('Toyota', 'Camry', '2018')
+    assert record['price'] == '27 500 AZN'
+    assert record['mileage'] == '95 000 km'
+    assert record['credit_available'] == 'Bəli'
+    assert (record['views'], record['updated'], record['listing_id']) == ('1 204', '28-May-2025', '0000101')
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_detail_page_fallbacks(backend):
+    def parse(slug):
+        return parse_car_page(read_fixture(DETAIL_DIR, slug), f"{BASE_URL}/cars/{slug}", backend)
+
+    assert parse('0000102-kia-rio')['phone'] == '(055)000-02-02'  # no phone class, matched by shape
+    assert parse('0000103-lada-2107')['price'] == '6 300 AZN'     # class merely containing "price"
+    no_contact = parse('0000104-hyundai-elantra')
+    assert no_contact['price'] == '33 000 AZN'                    # found by scanning the text
+    assert no_contact['phone'] == no_contact['owner'] == no_contact['listing_id'] == ''
+
+@pytest.mark.parametrize('backend', sorted(BACKENDS))
+def test_index_page_cards(backend):
+    cards, last_page = parse_index_cards(read_fixture(INDEX_DIR, 'new-ads-1.html'), BASE_URL, backend)
+    assert last_page == 2
+    assert [card['listing_id'] for card in cards] == ['0000101', '0000102', '0000103']
+    assert cards[0] == {'url': f"{BASE_URL}/cars/0000101-toyota-camry", 'listing_id': '0000101',
+                        'title': 'Toyota Camry', 'price': '27 500 AZN', 'year': '2018',
+                        'mileage': '95 000 km', 'thumbnail': f"{BASE_URL}/thumbs/0000101.jpg"}
+    assert cards[1]['thumbnail'] == f"{BASE_URL}/thumbs/0000102.jpg"  # lazy-loaded data-src
+
+    cards, _ = parse_index_cards(read_fixture(INDEX_DIR, 'new-ads-2.html'), BASE_URL, backend)
+    assert cards[1]['url'] == f"{BASE_URL}/cars/0000101-toyota-camry"  # trailing slash canonicalized
@@ -0,0 +1,115 @@
+"""AdaptiveRateLimiter on a fake clock: token bucket, AIMD and Retry-After pauses"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from ratelimit import (ADDITIVE_INCREASE, DECREASE_COOLDOWN, MULTIPLICATIVE_DECREASE, AdaptiveRateLimiter,
+                       retry_after_seconds)
+
+URL = 'https://www.avtovitrin.com/cars/0000101-toyota-camry'
+HOST = 'www.avtovitrin.com'
+
+class FakeClock:
+    """Monotonic clock that only moves when told to, or when slept on"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None, ttfb=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.timings = {} if ttfb is None else {'ttfb': ttfb}
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def limiter(clock, rps=2.0, **kwargs):
+    return AdaptiveRateLimiter(rps, log=lambda message: None, clock=clock, sleep=clock.sleep, **kwargs)
+
+def rate(limiter):
+    return limiter.hosts[HOST].rate
+
+def test_token_bucket_paces_after_the_burst(clock):
+    throttle = limiter(clock, rps=2.0, burst=2.0)
+    for _ in range(2):
+        throttle.wait(URL)
+    assert clock.slept == []
+    throttle.wait(URL)
+    throttle.wait(URL)
+    assert clock.slept == pytest.approx([0.5, 0.5])
+
+def test_additive_increase_on_healthy_responses(clock):
+    throttle = limiter(clock, rps=2.0)
+    throttle.observe(URL, FakeResponse())
+    assert rate(throttle) == pytest.approx(2.0 + ADDITIVE_INCREASE / 2.0)
+    throttle.observe(URL, FakeResponse())
+    assert rate(throttle) == pytest.approx(2.5 + ADDITIVE_INCREASE / 2.5)
+    throttle.observe(URL, FakeResponse(404))  # client errors neither raise nor cut the rate
+    assert rate(throttle) == pytest.approx(2.9)
+    assert throttle.hosts[HOST].increases == 2
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_multiplicative_decrease_once_per_cooldown(clock, status):
+    throttle = limiter(clock, rps=4.0)
+    throttle.observe(URL, FakeResponse(status))
+    assert rate(throttle) == 4.0 * MULTIPLICATIVE_DECREASE
+    throttle.observe(URL, FakeResponse(status))  # same burst of errors
+    assert rate(throttle) == 4.0 * MULTIPLICATIVE_DECREASE
+    clock.now += DECREASE_COOLDOWN
+    throttle.observe(URL, FakeResponse(status))
+    assert rate(throttle) == 4.0 * MULTIPLICATIVE_DECREASE ** 2
+    assert throttle.hosts[HOST].decreases == 2
+
+def test_failures_and_slow_responses_decrease(clock):
+    throttle = limiter(clock, rps=4.0)
+    throttle.observe_failure(URL, TimeoutError())
+    assert rate(throttle) == 2.0
+    clock.now += DECREASE_COOLDOWN
+    throttle.observe(URL, FakeResponse(ttfb=0.1))
+    assert rate(throttle) == pytest.approx(2.5)
+    throttle.observe(URL, FakeResponse(ttfb=2.0))  # smoothed 0.48 s > 3 x best 0.1 s
+    assert rate(throttle) == pytest.approx(1.25)
+
+def test_retry_after_blocks_the_host(clock):
+    throttle = limiter(clock, rps=2.0, burst=2.0)
+    throttle.observe(URL, FakeResponse(429, {'Retry-After': '5'}))
+    assert throttle.hosts[HOST].pauses == 1
+    throttle.wait(URL)
+    assert clock.slept == [5.0]
+    throttle.wait(URL)  # tokens banked during the pause
+    assert clock.slept == [5.0]
+    throttle.wait('https://other.example/')  # other hosts are not blocked
+    assert clock.slept == [5.0]
+
+def test_retry_after_header_forms():
+    now = datetime(2025, 6, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert retry_after_seconds('7') == 7.0
+    assert retry_after_seconds('Sun, 01 Jun 2025 12:00:30 GMT', now) == 30.0
+    assert retry_after_seconds('Sun, 01 Jun 2025 11:59:00 GMT', now) == 0.0
+    assert retry_after_seconds('soon') is None and retry_after_seconds(None) is None
+
+def test_rate_is_clamped(clock):
+    assert AdaptiveRateLimiter(50.0, max_rps=10.0).initial == 10.0
+    assert AdaptiveRateLimiter(0.01, min_rps=0.2).initial == 0.2
+
+    throttle = limiter(clock, rps=9.9, max_rps=10.0)
+    for _ in range(3):
+        throttle.observe(URL, FakeResponse())
+    assert rate(throttle) == 10.0 and throttle.hosts[HOST].increases == 1
+
+    throttle = limiter(clock, rps=0.3, min_rps=0.2)
+    for _ in range(3):
+        throttle.observe(URL, FakeResponse(503))
+        clock.now += DECREASE_COOLDOWN
+    assert rate(throttle) == 0.2
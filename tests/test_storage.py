@@ -0,0 +1,87 @@
+"""ListingStore change detection across crawl runs"""
+
+import pytest
+
+from storage import ListingStore, load_changes, load_listings, load_price_history
+
+BASE_URL = 'https://www.avtovitrin.com'
+
+def record(listing_id, price='27 500 AZN', base_url=BASE_URL, **fields):
+    return dict({'url': f"{base_url}/cars/{listing_id}-toyota-camry", 'listing_id': listing_id,
+                 'brand': 'Toyota', 'model': 'Camry', 'year': '2018', 'price': price,
+                 'mileage': '95 000 km', 'updated': '28-May-2025'}, **fields)
+
+@pytest.fixture
+def crawl_run(tmp_path):
+    """Store one crawl's records, with each run a minute after the last"""
+    path = str(tmp_path / 'listings.sqlite')
+    runs = []
+
+    def run(*records, listed=(), complete=True):
+        with ListingStore(path) as store:
+            store.crawl_time = f"2025-06-01T12:{len(runs):02d}:00Z"
+            for item in records:
+                store.upsert(item)
+            store.mark_listed(listed)
+            if complete:
+                store.mark_removed()
+            runs.append(store.crawl_time)
+            return store.changes
+
+    run.path = path
+    run.times = runs
+    return run
+
+def test_new_listings_get_a_price_history_row(crawl_run):
+    changes = crawl_run(record('0000101'), record('0000102', price='9 800 AZN'))
+    assert (changes['new'], changes['unchanged']) == (2, 0)
+    history = load_price_history(crawl_run.path)
+    assert list(history['listing_id']) == ['0000101', '0000102']
+    assert list(history['price_numeric']) == [27500, 9800]
+    assert list(load_changes(crawl_run.path)['change']) == ['new', 'new']
+
+def test_unchanged_listing_only_bumps_last_seen(crawl_run):
+    crawl_run(record('0000101'))
+    # Same listing through another host, port and scheme: not a change
+    changes = crawl_run(record('0000101', base_url='http://127.0.0.1:8000'))
+    assert (changes['unchanged'], changes['changed'], changes['new']) == (1, 0, 0)
+    listings = load_listings(crawl_run.path)
+    assert (listings.loc[0, 'first_seen'], listings.loc[0, 'last_seen']) == tuple(crawl_run.times)
+    assert len(load_changes(crawl_run.path)) == 1
+    assert len(load_price_history(crawl_run.path)) == 1
+
+def test_changed_listing_logs_fields_and_price(crawl_run):
+    crawl_run(record('0000101'))
+    changes = crawl_run(record('0000101', price='26 900 AZN', views='1 300'))
+    assert changes['changed'] == 1
+    logged = load_changes(crawl_run.path).iloc[-1]
+    assert logged['change'] == 'changed'
+    assert logged['fields'] == {'price': ['27 500 AZN', '26 900 AZN'], 'views': ['', '1 300']}
+    history = load_price_history(crawl_run.path)
+    assert list(history['price']) == ['27 500 AZN', '26 900 AZN']
+    assert list(history['observed_at']) == crawl_run.times
+    assert load_listings(crawl_run.path).loc[0, 'price'] == '26 900 AZN'
+
+def test_listing_missing_from_a_complete_crawl_is_removed(crawl_run):
+    crawl_run(record('0000101'), record('0000102'), record('0000103'))
+    # 0000102 was listed but not fetched (--new-only, dead letter); 0000103 is gone
+    changes = crawl_run(record('0000101'), listed=['0000102'])
+    assert changes['removed'] == 1
+    removed = load_listings(crawl_run.path).set_index('listing_id')['removed_at']
+    assert removed.isna().to_dict() == {'0000101': True, '0000102': True, '0000103': False}
+    assert list(load_changes(crawl_run.path, since=crawl_run.times[1])['listing_id']) == ['0000103']
+
+    changes = crawl_run(record('0000101'), record('0000103'))  # back on the site
+    assert changes['relisted'] == 1 and changes['removed'] == 1  # 0000102 not seen at all this time
+
+def test_incomplete_crawl_removes_nothing(crawl_run):
+    crawl_run(record('0000101'), record('0000102'))
+    changes = crawl_run(record('0000101'), complete=False)
+    assert changes['removed'] == 0
+    assert load_listings(crawl_run.path)['removed_at'].isna().all()
+
+def test_failed_fetch_keeps_the_stored_listing(crawl_run):
+    crawl_run(record('0000101'), record('0000102'))
+    changes = crawl_run(record('0000101'), {'url': f"{BASE_URL}/cars/0000102-kia-rio", 'error': 'HTTP 503'})
+    assert changes['removed'] == 0
+    assert load_listings(crawl_run.path).set_index('listing_id').loc['0000102', 'price'] == '27 500 AZN'
@@ -0,0 +1,174 @@
+"""
+Streaming record writers for crawl output, fed one record at a time:
+- csv: appended rows, flushed every `flush_every` records
+- jsonl: one JSON object per line, flushed the same way
+- xlsx: openpyxl write-only workbook (rows streamed to disk, constant memory)
+- parquet: all-string columns written one row group per `row_group_size` records
+Every writer keeps the phone/owner-first column order, writes to
+`<path>.partial` while the crawl runs and renames it into place only when
+the crawl finishes cleanly.
+"""
+
+import csv
+import json
+import os
+
+from parsers import RECORD_FIELDS
+
+OUTPUT_FIELDS = RECORD_FIELDS + ['error']
+DEFAULT_FLUSH_EVERY = 20
+DEFAULT_ROW_GROUP_SIZE = 1000
+
+class RecordWriter:
+    """Base writer: `path + '.partial'` while open, renamed to `path` by finish().
+
+    `flush_every` is honoured by the line-oriented formats; XLSX and
+    Parquet files only become readable once closed.
+    """
+
+    extension = None
+
+    def __init__(self, path, fields=OUTPUT_FIELDS, flush_every=DEFAULT_FLUSH_EVERY):
+        self.path = path
+        self.partial_path = path + '.partial'
+        self.fields = fields
+        self.flush_every = flush_every
+        self.rows = 0
+
+    def row(self, record):
+        return ['' if record.get(field) is None else record.get(field) for field in self.fields]
+
+    def write(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def finish(self):
+        """Close and move the complete file into place"""
+        self.close()
+        os.replace(self.partial_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        # A failed crawl leaves the .partial file behind for inspection
+        if exc_type is None:
+            self.finish()
+        else:
+            self.close()
+
+class CsvRecordWriter(RecordWriter):
+    """Appends records to a CSV as they arrive, flushing every `flush_every` rows"""
+
+    extension = 'csv'
+
+    def __init__(self, path, fields=OUTPUT_FIELDS, flush_every=DEFAULT_FLUSH_EVERY):
+        super().__init__(path, fields, flush_every)
+        self.file = open(self.partial_path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=fields, extrasaction='ignore')
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class JsonlRecordWriter(RecordWriter):
+    """One JSON object per record, keys in output column order"""
+
+    extension = 'jsonl'
+
+    def __init__(self, path, fields=OUTPUT_FIELDS, flush_every=DEFAULT_FLUSH_EVERY):
+        super().__init__(path, fields, flush_every)
+        self.file = open(self.partial_path, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.file.write(json.dumps(dict(zip(self.fields, self.row(record))), ensure_ascii=False) + '\n')
+        self.rows += 1
+        if self.rows % self.flush_every == 0:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+class XlsxRecordWriter(RecordWriter):
+    """openpyxl write-only workbook: rows go straight to a temporary sheet file, not into memory"""
+
+    extension = 'xlsx'
+
+    def __init__(self, path, fields=OUTPUT_FIELDS, flush_every=DEFAULT_FLUSH_EVERY):
+        from openpyxl import Workbook
+
+        super().__init__(path, fields, flush_every)
+        self.workbook = Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(fields)
+
+    def write(self, record):
+        self.sheet.append(self.row(record))
+        self.rows += 1
+
+    def close(self):
+        if self.workbook is not None:
+            self.workbook.save(self.partial_path)
+            self.workbook = None
+
+class ParquetRecordWriter(RecordWriter):
+    """String-typed Parquet file, written one row group per `row_group_size` records"""
+
+    extension = 'parquet'
+
+    def __init__(self, path, fields=OUTPUT_FIELDS, flush_every=DEFAULT_FLUSH_EVERY,
+                 row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        super().__init__(path, fields, flush_every)
+        self.pa = pa
+        self.schema = pa.schema([(field, pa.string()) for field in fields])
+        self.writer = pq.ParquetWriter(self.partial_path, self.schema)
+        self.row_group_size = row_group_size
+        self.buffer = []
+
+    def write(self, record):
+        self.buffer.append(self.row(record))
+        self.rows += 1
+        if len(self.buffer) >= self.row_group_size:
+            self._write_group()
+
+    def _write_group(self):
+        columns = [self.pa.array(column, self.pa.string()) for column in zip(*self.buffer)]
+        self.writer.write_table(self.pa.Table.from_arrays(columns, schema=self.schema))
+        self.buffer = []
+
+    def close(self):
+        if self.writer is not None:
+            if self.buffer:
+                self._write_group()
+            self.writer.close()
+            self.writer = None
+
+# format name -> (writer class, module it needs)
+WRITERS = {
+    'csv': (CsvRecordWriter, None),
+    'jsonl': (JsonlRecordWriter, None),
+    'xlsx': (XlsxRecordWriter, 'openpyxl'),
+    'parquet': (ParquetRecordWriter, 'pyarrow'),
+}
+OUTPUT_FORMATS = tuple(WRITERS)
+
+def open_writer(fmt, base_path, fields=OUTPUT_FIELDS, flush_every=DEFAULT_FLUSH_EVERY):
+    """Writer for `fmt` at `base_path.<ext>`, with a helpful error when its library is missing"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown output format '{fmt}' (choose from {', '.join(OUTPUT_FORMATS)})")
+    writer_class, module = WRITERS[fmt]
+    try:
+        return writer_class(f"{base_path}.{writer_class.extension}", fields, flush_every)
+    except ImportError:
+        raise ValueError(f"Output format '{fmt}' needs {module} (pip install {module})") from None